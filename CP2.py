@@ -1,25 +1,960 @@
+import csv
+import heapq
+import itertools
 import math
+import random
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, replace
 from datetime import datetime, timedelta
-import folium
-import webbrowser
 import os
 
+# folium e webbrowser são importados só em visualizar_caminho: o folium puxa
+# jinja2, branca e requests, e a maioria dos processos nunca desenha um mapa.
+# Pelo mesmo motivo, concurrent.futures e multiprocessing só são importados
+# pelo processamento paralelo.
+
 # --- Constantes do Desafio ---
 VELOCIDADE_TREM_KMH = 35.0
 PENALIDADE_TROCA_LINHA_MIN = 3.0
 
+# Faixas de horário com o tempo de espera de cada uma: (hora inicial, hora final, minutos)
+FAIXAS_ESPERA = ((0, 11, 1.5), (11, 18, 1.0), (18, 24, 2.0))
+
+# Folga, em minutos, ao comparar o fim de um trajeto com o fim da faixa de
+# espera: cobre o arredondamento em microssegundos do timedelta ao avançar a hora
+FOLGA_FAIXA_MIN = 1e-3
+
+# Identificação do formato binário de salvar_snapshot()/carregar_snapshot()
+SNAPSHOT_MAGICO = b"CP2REDE\0"
+SNAPSHOT_VERSAO = 1
+
+# Orçamento padrão de nós expandidos da busca do modo 'maior' (branch-and-bound),
+# da ordem de um segundo de busca; o resultado traz completo=False se estourar
+LIMITE_NOS_MAIOR = 100_000
+
+# Tamanho da amostra guardada por faixa de tempos na seleção da mediana do
+# modo 'medio': a memória da seleção não depende do número de caminhos
+TAMANHO_AMOSTRA_MEDIANA = 4096
+
+MODOS = ("menor", "medio", "maior")
+ALGORITMOS = ("dijkstra", "astar", "bidirecional")
+
+
+@dataclass
+class ResultadoRota:
+    """Rota calculada pelo roteador, sem nenhuma apresentação associada."""
+
+    origem: str
+    destino: str
+    hora_inicio: str
+    modo: str
+    caminho: list
+    linhas: list
+    tempo: float
+    trocas: int
+    # False se a busca parou no orçamento (modo 'maior'): a rota é a melhor
+    # encontrada até ali, e não necessariamente a ótima
+    completo: bool = True
+
+    def como_dict(self):
+        """Versão em dicionário simples (por exemplo, para serializar em JSON)."""
+        return asdict(self)
+
+
+@dataclass
+class TrechoPerfil:
+    """Intervalo de partidas (inclusivo, em HH:MM) com a mesma rota mais rápida."""
+
+    partida_inicio: str
+    partida_fim: str
+    tempo: float
+    resultado: ResultadoRota
+
+
+@dataclass
+class PerfilPartidas:
+    """Tempo de viagem mais rápido em função do horário de partida, por trechos."""
+
+    origem: str
+    destino: str
+    trechos: list
+    buscas: int
+
+    def melhor_partida(self):
+        """Trecho de menor tempo de viagem (o mais cedo, em caso de empate)."""
+        if not self.trechos:
+            return None
+        return min(self.trechos, key=lambda trecho: trecho.tempo)
+
+    def como_dict(self):
+        """Versão em dicionário simples (por exemplo, para serializar em JSON)."""
+        return asdict(self)
+
+
+def _importar_numpy():
+    """Importa o NumPy sob demanda; ele só é necessário para os recursos vetorizados."""
+    try:
+        import numpy
+    except ImportError as erro:
+        raise ImportError(
+            "Este recurso requer o NumPy. Instale com: pip install numpy"
+        ) from erro
+    return numpy
+
+
+class _ContagemFaixas:
+    """
+    Resultado de uma passada da seleção da mediana (ver _tempo_mediano):
+    quantos tempos são <= inferior e, em cada faixa em que os cortes dividem
+    os tempos acima de inferior, a quantidade, o menor e o maior tempo e uma
+    amostra uniforme (reservoir sampling) de até TAMANHO_AMOSTRA_MEDIANA
+    tempos. Se a faixa tem até esse tanto de tempos, a amostra tem todos.
+    """
+
+    def __init__(self, inferior, cortes):
+        self.inferior = inferior
+        self.cortes = cortes
+        self.abaixo = 0
+        self.quantidades = [0] * (len(cortes) + 1)
+        self.menores = [math.inf] * (len(cortes) + 1)
+        self.maiores = [-math.inf] * (len(cortes) + 1)
+        self.amostras = [array("d") for _ in range(len(cortes) + 1)]
+
+    def adicionar(self, tempo, aleatorio):
+        if tempo <= self.inferior:
+            self.abaixo += 1
+            return
+        # A faixa i é (cortes[i - 1], cortes[i]]
+        faixa = bisect_left(self.cortes, tempo)
+        self.quantidades[faixa] += 1
+        if tempo < self.menores[faixa]:
+            self.menores[faixa] = tempo
+        if tempo > self.maiores[faixa]:
+            self.maiores[faixa] = tempo
+        amostra = self.amostras[faixa]
+        if len(amostra) < TAMANHO_AMOSTRA_MEDIANA:
+            amostra.append(tempo)
+        else:
+            posicao = aleatorio.randrange(self.quantidades[faixa])
+            if posicao < TAMANHO_AMOSTRA_MEDIANA:
+                amostra[posicao] = tempo
+
+    def juntar(self, outra, aleatorio):
+        """Acrescenta a contagem de outra parte dos tempos, com os mesmos cortes."""
+        self.abaixo += outra.abaixo
+        for faixa, quantidade in enumerate(outra.quantidades):
+            self.amostras[faixa] = _juntar_amostras(
+                self.amostras[faixa],
+                self.quantidades[faixa],
+                outra.amostras[faixa],
+                quantidade,
+                aleatorio,
+            )
+            self.quantidades[faixa] += quantidade
+            self.menores[faixa] = min(self.menores[faixa], outra.menores[faixa])
+            self.maiores[faixa] = max(self.maiores[faixa], outra.maiores[faixa])
+
+
+def _juntar_amostras(amostra_a, quantidade_a, amostra_b, quantidade_b, aleatorio):
+    """
+    Amostra uniforme de até TAMANHO_AMOSTRA_MEDIANA tempos da união de duas
+    partes, a partir das amostras uniformes de cada uma.
+    """
+    if quantidade_a + quantidade_b <= TAMANHO_AMOSTRA_MEDIANA:
+        return amostra_a + amostra_b
+    # Sorteia, sem reposição, de qual parte vem cada elemento da nova amostra
+    restantes = [quantidade_a, quantidade_b]
+    for _ in range(TAMANHO_AMOSTRA_MEDIANA):
+        parte = 0 if aleatorio.randrange(restantes[0] + restantes[1]) < restantes[0] else 1
+        restantes[parte] -= 1
+    amostra_a, amostra_b = list(amostra_a), list(amostra_b)
+    aleatorio.shuffle(amostra_a)
+    aleatorio.shuffle(amostra_b)
+    return array(
+        "d",
+        amostra_a[: quantidade_a - restantes[0]] + amostra_b[: quantidade_b - restantes[1]],
+    )
+
+
+def _tempo_mediano(contar):
+    """
+    Mediana inferior (elemento (n-1)//2 em ordem crescente) de uma sequência
+    de tempos que pode ser percorrida de novo, mas não guardada.
+
+    contar(inferior, superior, cortes) percorre os tempos <= superior e
+    devolve a _ContagemFaixas deles. A primeira passada cobre todos os
+    tempos; cada uma das seguintes só a faixa que contém a mediana, dividida
+    em três por cortes tirados da amostra a 2*sqrt(TAMANHO_AMOSTRA_MEDIANA)
+    posições de cada lado da posição estimada. A faixa do meio costuma ficar
+    umas 16 vezes menor a cada passada, e a seleção termina com a faixa
+    inteira na amostra ou com um único valor nela. Os cortes ficam sempre
+    entre o menor e o maior tempo da faixa, então toda passada a reduz.
+
+    Retorna (tempo mediano, quantos tempos iguais a ele vêm antes da
+    mediana na ordenação estável), ou None se não houver tempos.
+    """
+    inferior, superior, cortes = -math.inf, math.inf, ()
+    posicao_mediana = None
+    while True:
+        contagem = contar(inferior, superior, cortes)
+        if posicao_mediana is None:
+            total = contagem.abaixo + sum(contagem.quantidades)
+            if total == 0:
+                return None
+            posicao_mediana = (total - 1) // 2
+
+        posicao = posicao_mediana - contagem.abaixo
+        limites = (inferior, *cortes, superior)
+        for faixa, quantidade in enumerate(contagem.quantidades):
+            if posicao < quantidade:
+                break
+            posicao -= quantidade
+        inferior, superior = limites[faixa], limites[faixa + 1]
+
+        # Os tempos <= inferior são menores que todos os da faixa
+        menor, maior = contagem.menores[faixa], contagem.maiores[faixa]
+        if menor == maior:
+            return menor, posicao
+        amostra = sorted(contagem.amostras[faixa])
+        if len(amostra) == quantidade:
+            tempo = amostra[posicao]
+            return tempo, posicao - bisect_left(amostra, tempo)
+
+        estimada = posicao * len(amostra) // quantidade
+        margem = 2 * math.isqrt(len(amostra))
+        cortes = sorted(
+            {
+                amostra[i]
+                for i in (estimada - margem, estimada + margem)
+                if 0 <= i < len(amostra) and menor <= amostra[i] < maior
+            }
+        )
+        if not cortes:
+            meio = (menor + maior) / 2
+            cortes = [meio if meio < maior else menor]
+        cortes = tuple(cortes)
+
+
+class CacheRotas:
+    """
+    Cache das rotas mais rápidas, compartilhado entre consultas.
+    A chave é (origem, destino, faixa de espera, algoritmo) e cada entrada
+    guarda a rota e o seu tempo, para que o roteador saiba se o resultado
+    continua válido em outro horário da mesma faixa de espera. Acessos
+    protegidos por lock e contadores de acertos/falhas para acompanhar a
+    eficácia do cache.
+    """
+
+    def __init__(self):
+        self._entradas = {}
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave, minutos_na_faixa):
+        """
+        Retorna a rota guardada para a chave, desde que termine antes de a
+        faixa de espera acabar (tempo <= minutos_na_faixa); senão, None.
+        """
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None or entrada[1] > minutos_na_faixa:
+                self.falhas += 1
+                return None
+            self.acertos += 1
+            return entrada[0]
+
+    def guardar(self, chave, rota, tempo):
+        with self._lock:
+            self._entradas[chave] = (rota, tempo)
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self.acertos = 0
+            self.falhas = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entradas)
+
+    def estatisticas(self):
+        """Resumo do uso do cache: entradas, acertos, falhas e taxa de acerto."""
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "entradas": len(self._entradas),
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            }
+
+
+class CacheRotasLRU(CacheRotas):
+    """
+    Variante limitada do cache de rotas, para processos de longa duração.
+    Descarta as entradas usadas há mais tempo (LRU) quando passa do número
+    máximo de entradas ou do orçamento aproximado de memória em bytes.
+    """
+
+    def __init__(self, max_entradas=None, max_bytes=None):
+        super().__init__()
+        if max_entradas is None and max_bytes is None:
+            raise ValueError("Informe max_entradas e/ou max_bytes.")
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()
+        self._tamanhos = {}
+        self.bytes_em_uso = 0
+        self.remocoes = 0
+
+    def obter(self, chave, minutos_na_faixa):
+        rota = super().obter(chave, minutos_na_faixa)
+        if rota is not None:
+            with self._lock:
+                # Marca como usada recentemente (se ainda não foi descartada)
+                if chave in self._entradas:
+                    self._entradas.move_to_end(chave)
+        return rota
+
+    def guardar(self, chave, rota, tempo):
+        entrada = (rota, tempo)
+        tamanho = self._estimar_bytes(chave, entrada)
+        with self._lock:
+            # Uma entrada maior que o orçamento inteiro nunca é guardada
+            if self.max_bytes is not None and tamanho > self.max_bytes:
+                return
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = entrada
+            self._tamanhos[chave] = tamanho
+            self.bytes_em_uso += tamanho
+
+            while self._excedeu_limites():
+                chave_antiga = next(iter(self._entradas))
+                self._remover(chave_antiga)
+                self.remocoes += 1
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._tamanhos.clear()
+            self.bytes_em_uso = 0
+            self.remocoes = 0
+            self.acertos = 0
+            self.falhas = 0
+
+    def estatisticas(self):
+        resumo = super().estatisticas()
+        with self._lock:
+            resumo.update(
+                {
+                    "bytes": self.bytes_em_uso,
+                    "remocoes": self.remocoes,
+                    "max_entradas": self.max_entradas,
+                    "max_bytes": self.max_bytes,
+                }
+            )
+        return resumo
+
+    def _remover(self, chave):
+        del self._entradas[chave]
+        self.bytes_em_uso -= self._tamanhos.pop(chave)
+
+    def _excedeu_limites(self):
+        if self.max_entradas is not None and len(self._entradas) > self.max_entradas:
+            return True
+        return self.max_bytes is not None and self.bytes_em_uso > self.max_bytes
+
+    @staticmethod
+    def _estimar_bytes(chave, entrada):
+        """
+        Estimativa do espaço ocupado pela entrada: a chave, a tupla
+        (rota, tempo), o dict da rota e as suas listas.
+        """
+        # Os nomes de estações e linhas são compartilhados com o grafo
+        rota = entrada[0]
+        return (
+            sys.getsizeof(chave)
+            + sys.getsizeof(entrada)
+            + sys.getsizeof(rota)
+            + sys.getsizeof(rota["caminho"])
+            + sys.getsizeof(rota["linhas"])
+            + sys.getsizeof(rota["tempo"])
+        )
+
+
+class GrafoCompacto:
+    """
+    Representação compacta da rede usada pelos motores de busca.
+    Estações e linhas viram índices inteiros e a adjacência fica em arrays
+    no formato CSR: as conexões da estação i ocupam as posições
+    inicio[i]..inicio[i + 1] de vizinhos, linhas, distancias e tempos.
+    Os nomes só são consultados na fronteira da API, ao montar resultados.
+    """
+
+    def __init__(self, graph):
+        self.estacoes = list(graph)
+        self.indice_estacao = {nome: i for i, nome in enumerate(self.estacoes)}
+        self.nomes_linhas = []
+        self.indice_linha = {}
+
+        self.inicio = array("i", [0])
+        self.vizinhos = array("i")
+        self.linhas = array("i")
+        self.distancias = array("d")
+        self.tempos = array("d")
+
+        # Mantém a mesma ordem de conexões do grafo em dicionário
+        for nome in self.estacoes:
+            for conexao in graph[nome]:
+                linha = conexao["linha"]
+                if linha not in self.indice_linha:
+                    self.indice_linha[linha] = len(self.nomes_linhas)
+                    self.nomes_linhas.append(linha)
+                self.vizinhos.append(self.indice_estacao[conexao["vizinho"]])
+                self.linhas.append(self.indice_linha[linha])
+                self.distancias.append(conexao["distancia_km"])
+                self.tempos.append(conexao["tempo"])
+            self.inicio.append(len(self.vizinhos))
+
+        # Estados de busca (estação, linha de chegada) codificados como um único
+        # inteiro; o código de linha 0 significa "ainda sem linha" (partida).
+        self.codigos_por_estacao = len(self.nomes_linhas) + 1
+        self.total_estados = len(self.estacoes) * self.codigos_por_estacao
+
+        # Para cada meia-aresta v->u, a posição da meia-aresta gêmea u->v,
+        # usada pelas buscas que andam do destino para a origem
+        posicoes = {}
+        for u in range(len(self.estacoes)):
+            for i in range(self.inicio[u], self.inicio[u + 1]):
+                posicoes.setdefault((u, self.vizinhos[i], self.linhas[i]), i)
+        self.gemea = array(
+            "i",
+            (
+                posicoes[(self.vizinhos[j], v, self.linhas[j])]
+                for v in range(len(self.estacoes))
+                for j in range(self.inicio[v], self.inicio[v + 1])
+            ),
+        )
+
+    @classmethod
+    def de_arrays(
+        cls, estacoes, nomes_linhas, inicio, vizinhos, linhas, distancias, tempos, gemea
+    ):
+        """
+        Remonta o grafo a partir de arrays já prontos, sem copiá-los: servem
+        array ou memoryview (por exemplo, views sobre memória compartilhada).
+        """
+        grafo = cls.__new__(cls)
+        grafo.estacoes = list(estacoes)
+        grafo.indice_estacao = {nome: i for i, nome in enumerate(grafo.estacoes)}
+        grafo.nomes_linhas = list(nomes_linhas)
+        grafo.indice_linha = {nome: i for i, nome in enumerate(grafo.nomes_linhas)}
+        grafo.inicio = inicio
+        grafo.vizinhos = vizinhos
+        grafo.linhas = linhas
+        grafo.distancias = distancias
+        grafo.tempos = tempos
+        grafo.gemea = gemea
+        grafo.codigos_por_estacao = len(grafo.nomes_linhas) + 1
+        grafo.total_estados = len(grafo.estacoes) * grafo.codigos_por_estacao
+        return grafo
+
+    def atualizar_tempos(self, velocidade_kmh):
+        """Recalcula os tempos de deslocamento a partir das distâncias guardadas."""
+        for i, distancia_km in enumerate(self.distancias):
+            self.tempos[i] = (distancia_km / velocidade_kmh) * 60
+
+    def custo_trecho(self, espera, i, linha_anterior):
+        """
+        Modelo de custo de todos os motores para o trecho na posição CSR i,
+        chegando à estação de partida pela linha_anterior (-1 na origem).
+        Retorna (tempo do trecho, troca de linha): a espera na plataforma, o
+        deslocamento e PENALIDADE_TROCA_LINHA_MIN se houver troca de linha.
+        """
+        troca_de_linha = linha_anterior >= 0 and linha_anterior != self.linhas[i]
+        penalidade = PENALIDADE_TROCA_LINHA_MIN if troca_de_linha else 0
+        return espera + self.tempos[i] + penalidade, troca_de_linha
+
+    def linhas_da_estacao(self, estacao):
+        """Linhas que passam pela estação, em ordem, precedidas de -1 (partida)."""
+        return sorted(
+            {-1} | {self.linhas[i] for i in range(self.inicio[estacao], self.inicio[estacao + 1])}
+        )
+
+    def estado(self, estacao, linha):
+        """Codifica (estação, linha de chegada) em um inteiro; linha -1 = nenhuma."""
+        return estacao * self.codigos_por_estacao + linha + 1
+
+    def decompor(self, estado):
+        """
+        Inverso de estado(): retorna (estação, linha de chegada ou -1). Aceita
+        também as cópias de um estado que as buscas criam quando precisam de
+        mais de um rótulo nele (estado + k * total_estados).
+        """
+        estacao, codigo_linha = divmod(estado % self.total_estados, self.codigos_por_estacao)
+        return estacao, codigo_linha - 1
+
+
+class TabelaTempos:
+    """
+    Tabelas pré-calculadas de menores tempos entre todos os pares de estações,
+    uma para cada faixa de FAIXAS_ESPERA (espera constante dentro da faixa).
+
+    Para cada faixa f:
+    - tempos[f]: array n x n com o menor tempo de cada origem a cada destino
+    - proximo_trecho[f]: array S x n com a posição CSR do próximo trecho a
+      seguir, a partir de cada estado (estação, linha de chegada), rumo a
+      cada destino (-1 no próprio destino ou se não houver caminho)
+
+    O próximo trecho depende da linha de chegada, e não só da estação,
+    porque a penalidade de troca muda o melhor caminho restante.
+    """
+
+    def __init__(self, grafo, tempos=None, proximo_trecho=None):
+        self.n = len(grafo.estacoes)
+
+        # Estados densos: para cada estação, "sem linha" (partida) e cada
+        # linha que passa por ela.
+        self.estados = array("i")
+        self.indice_estado = {}
+        self._estados_da_estacao = []
+        for estacao in range(self.n):
+            ids = []
+            for linha in grafo.linhas_da_estacao(estacao):
+                codigo = grafo.estado(estacao, linha)
+                self.indice_estado[codigo] = len(self.estados)
+                ids.append(len(self.estados))
+                self.estados.append(codigo)
+            self._estados_da_estacao.append(ids)
+
+        if tempos is not None:
+            # Tabelas já calculadas (por exemplo, em memória compartilhada)
+            self.tempos = list(tempos)
+            self.proximo_trecho = list(proximo_trecho)
+            return
+
+        self.tempos = []
+        self.proximo_trecho = []
+        for _, _, espera in FAIXAS_ESPERA:
+            tempos, proximos = self._calcular_faixa(grafo, espera)
+            self.tempos.append(tempos)
+            self.proximo_trecho.append(proximos)
+
+    def _calcular_faixa(self, grafo, espera):
+        """Uma busca reversa por destino, sobre os estados, com espera fixa."""
+        n = self.n
+        tempos = array("d", [math.inf]) * (n * n)
+        proximos = array("i", [-1]) * (len(self.estados) * n)
+
+        for destino in range(n):
+            # Todo estado na estação de destino já chegou: tempo restante zero
+            restante = {s: 0.0 for s in self._estados_da_estacao[destino]}
+            fila = [(0.0, s) for s in self._estados_da_estacao[destino]]
+            finalizados = set()
+
+            while fila:
+                tempo, estado = heapq.heappop(fila)
+                if estado in finalizados:
+                    continue
+                finalizados.add(estado)
+
+                v, linha = grafo.decompor(self.estados[estado])
+                if linha < 0:
+                    continue  # estados de partida não têm predecessores
+
+                # Trechos u->v pela mesma linha que chegou em v
+                for j in range(grafo.inicio[v], grafo.inicio[v + 1]):
+                    if grafo.linhas[j] != linha or grafo.vizinhos[j] == destino:
+                        continue
+                    u = grafo.vizinhos[j]
+                    i = grafo.gemea[j]
+                    for anterior in self._estados_da_estacao[u]:
+                        _, linha_anterior = grafo.decompor(self.estados[anterior])
+                        tempo_trecho, _ = grafo.custo_trecho(espera, i, linha_anterior)
+                        # Mesma ordem de soma de _montar_resultado (do fim para o início)
+                        novo_tempo = tempo_trecho + tempo
+                        if novo_tempo < restante.get(anterior, math.inf):
+                            restante[anterior] = novo_tempo
+                            proximos[anterior * n + destino] = i
+                            heapq.heappush(fila, (novo_tempo, anterior))
+
+            for origem in range(n):
+                partida = self._estados_da_estacao[origem][0]  # linha -1 vem primeiro
+                tempos[origem * n + destino] = restante.get(partida, math.inf)
+
+        return tempos, proximos
+
+    def consultar(self, grafo, origem, destino, faixa):
+        """
+        Retorna (tempo, trechos) do menor caminho na faixa, onde trechos são
+        as posições CSR percorridas, ou None se não houver caminho.
+        """
+        tempo = self.tempos[faixa][origem * self.n + destino]
+        if tempo == math.inf:
+            return None
+
+        proximos = self.proximo_trecho[faixa]
+        trechos = []
+        estado = self._estados_da_estacao[origem][0]
+        estacao = origem
+        while estacao != destino:
+            i = proximos[estado * self.n + destino]
+            trechos.append(i)
+            estacao = grafo.vizinhos[i]
+            estado = self.indice_estado[grafo.estado(estacao, grafo.linhas[i])]
+        return tempo, trechos
+
+
+class HierarquiaContracao:
+    """
+    Contraction hierarchies sobre o grafo de estados (estação, linha de
+    chegada) de uma faixa de FAIXAS_ESPERA, onde a espera é constante.
+
+    Cada estado é um nó e cada trecho do GrafoCompacto vira uma aresta com o
+    mesmo custo das buscas (espera + deslocamento + PENALIDADE_TROCA_LINHA_MIN
+    ao trocar de linha), então a penalidade é preservada exatamente. Um nó
+    "sumidouro" por estação recebe, com custo zero, todos os estados que
+    chegam nela, para que a consulta termine na estação e não em uma linha.
+
+    Os nós são contraídos em ordem de importância (diferença de arestas),
+    com atalhos onde a busca de testemunha não acha caminho alternativo tão
+    barato quanto o que passa pelo nó. A consulta é um Dijkstra
+    bidirecional que só sobe na hierarquia; os atalhos são desfeitos no fim.
+    """
+
+    def __init__(self, grafo, espera, limite_testemunha=64):
+        self.limite_testemunha = limite_testemunha
+        self.indice_estado = {}
+        estados = []
+        self._partida = []
+        for estacao in range(len(grafo.estacoes)):
+            for linha in grafo.linhas_da_estacao(estacao):
+                codigo = grafo.estado(estacao, linha)
+                self.indice_estado[codigo] = len(estados)
+                estados.append(codigo)
+            self._partida.append(self.indice_estado[grafo.estado(estacao, -1)])
+        self._primeiro_sumidouro = len(estados)
+        total = len(estados) + len(grafo.estacoes)
+
+        saida = [{} for _ in range(total)]
+        entrada = [{} for _ in range(total)]
+        # (a, b) -> (nó contraído no meio do atalho ou -1, posição CSR ou -1)
+        self._arestas = {}
+
+        def adicionar(a, b, custo, meio, trecho):
+            if custo < saida[a].get(b, math.inf):
+                saida[a][b] = custo
+                entrada[b][a] = custo
+                self._arestas[(a, b)] = (meio, trecho)
+
+        for a, codigo in enumerate(estados):
+            u, linha_anterior = grafo.decompor(codigo)
+            if linha_anterior >= 0:
+                adicionar(a, self._primeiro_sumidouro + u, 0.0, -1, -1)
+            for i in range(grafo.inicio[u], grafo.inicio[u + 1]):
+                b = self.indice_estado[grafo.estado(grafo.vizinhos[i], grafo.linhas[i])]
+                custo, _ = grafo.custo_trecho(espera, i, linha_anterior)
+                adicionar(a, b, custo, -1, i)
+
+        # Arestas para nós de nível mais alto, usadas pela consulta
+        self.acima_saida = [()] * total
+        self.acima_entrada = [()] * total
+        vizinhos_contraidos = [0] * total
+
+        def atalhos_necessarios(x):
+            atalhos = []
+            for u, custo_entrada in entrada[x].items():
+                alvos = {
+                    w: custo_entrada + custo_saida
+                    for w, custo_saida in saida[x].items()
+                    if w != u
+                }
+                if not alvos:
+                    continue
+                testemunhas = self._buscar_testemunhas(saida, u, x, max(alvos.values()))
+                for w, custo in alvos.items():
+                    if testemunhas.get(w, math.inf) > custo:
+                        atalhos.append((u, w, custo))
+            return atalhos
+
+        def prioridade(x):
+            arestas_removidas = len(entrada[x]) + len(saida[x])
+            return len(atalhos_necessarios(x)) - arestas_removidas + vizinhos_contraidos[x]
+
+        fila = [(prioridade(x), x) for x in range(total)]
+        heapq.heapify(fila)
+        self.nivel = array("i", [0]) * total
+        self.atalhos = 0
+        nivel = 0
+        while fila:
+            _, x = heapq.heappop(fila)
+            # Atualização preguiçosa: a prioridade pode ter mudado
+            atual = prioridade(x)
+            if fila and atual > fila[0][0]:
+                heapq.heappush(fila, (atual, x))
+                continue
+
+            self.nivel[x] = nivel
+            nivel += 1
+            self.acima_saida[x] = tuple(saida[x].items())
+            self.acima_entrada[x] = tuple(entrada[x].items())
+            for u, w, custo in atalhos_necessarios(x):
+                adicionar(u, w, custo, x, -1)
+                self.atalhos += 1
+            for u in entrada[x]:
+                del saida[u][x]
+                vizinhos_contraidos[u] += 1
+            for w in saida[x]:
+                del entrada[w][x]
+                vizinhos_contraidos[w] += 1
+            saida[x] = {}
+            entrada[x] = {}
+
+    def _buscar_testemunhas(self, saida, origem, ignorado, limite):
+        """
+        Dijkstra local a partir de origem sem passar pelo nó ignorado, até o
+        custo limite ou limite_testemunha nós fixados. Encontrar menos
+        testemunhas só gera atalhos a mais, nunca respostas erradas.
+        """
+        distancias = {origem: 0.0}
+        fila = [(0.0, origem)]
+        fixados = 0
+        while fila and fixados < self.limite_testemunha:
+            custo, no = heapq.heappop(fila)
+            if custo > distancias[no]:
+                continue
+            if custo > limite:
+                break
+            fixados += 1
+            for vizinho, custo_aresta in saida[no].items():
+                if vizinho == ignorado:
+                    continue
+                novo_custo = custo + custo_aresta
+                if novo_custo < distancias.get(vizinho, math.inf):
+                    distancias[vizinho] = novo_custo
+                    heapq.heappush(fila, (novo_custo, vizinho))
+        return distancias
+
+    def consultar(self, origem, destino):
+        """
+        Menor custo da estação origem à estação destino na faixa e as
+        posições CSR do caminho, ou None se não houver caminho.
+        """
+        if origem == destino:
+            return 0.0, []
+
+        inicio = self._partida[origem]
+        fim = self._primeiro_sumidouro + destino
+        distancias = ({inicio: 0.0}, {fim: 0.0})
+        anteriores = ({inicio: None}, {fim: None})
+        filas = ([(0.0, inicio)], [(0.0, fim)])
+        arestas = (self.acima_saida, self.acima_entrada)
+        melhor, encontro = math.inf, None
+        self.nos_expandidos = 0
+
+        while filas[0] or filas[1]:
+            # Avança o lado com a menor distância na fila
+            lado = 0 if filas[0] and (not filas[1] or filas[0][0] <= filas[1][0]) else 1
+            custo, no = heapq.heappop(filas[lado])
+            if custo >= melhor:
+                # Nenhum nó deste lado pode mais melhorar o encontro
+                filas[lado].clear()
+                continue
+            if custo > distancias[lado][no]:
+                continue
+            self.nos_expandidos += 1
+
+            outro = distancias[1 - lado].get(no)
+            if outro is not None and custo + outro < melhor:
+                melhor, encontro = custo + outro, no
+
+            for vizinho, custo_aresta in arestas[lado][no]:
+                novo_custo = custo + custo_aresta
+                if novo_custo < distancias[lado].get(vizinho, math.inf):
+                    distancias[lado][vizinho] = novo_custo
+                    anteriores[lado][vizinho] = no
+                    heapq.heappush(filas[lado], (novo_custo, vizinho))
+
+        if encontro is None:
+            return None
+
+        nos = []
+        no = encontro
+        while no is not None:
+            nos.append(no)
+            no = anteriores[0][no]
+        nos.reverse()
+        no = anteriores[1][encontro]
+        while no is not None:
+            nos.append(no)
+            no = anteriores[1][no]
+
+        trechos = []
+        for a, b in zip(nos, nos[1:]):
+            self._desfazer_atalho(a, b, trechos)
+        return melhor, trechos
+
+    def _desfazer_atalho(self, a, b, trechos):
+        """Acrescenta a trechos as posições CSR da aresta a->b, expandindo atalhos."""
+        pendentes = [(a, b)]
+        while pendentes:
+            a, b = pendentes.pop()
+            meio, trecho = self._arestas[(a, b)]
+            if meio >= 0:
+                # O lado esquerdo sai primeiro da pilha
+                pendentes.append((meio, b))
+                pendentes.append((a, meio))
+            elif trecho >= 0:
+                trechos.append(trecho)
+
+
+class ArvoreMenoresTempos:
+    """
+    Árvore de menores tempos de uma origem para todas as estações, produzida
+    por RoteadorMetroLondres.arvore_menores_tempos().
+
+    - tempos: {estação: tempo total em minutos}
+    - chegada: {estação: (estação, linha)} estado pelo qual se chega mais cedo
+    - predecessores: {(estação, linha): (estação, linha) anterior ou None}
+
+    Os predecessores ligam estados (estação, linha de chegada), e não só
+    estações: o melhor caminho até B pode passar por A chegando por outra
+    linha que não a do melhor caminho até A. Depois de uma queda de espera
+    o mesmo estado pode aparecer em dois caminhos com predecessores
+    diferentes; predecessores guarda o do caminho mais rápido até o próprio
+    estado, e caminho() reconstrói cada rota pelos rótulos da busca.
+    """
+
+    def __init__(self, roteador, origem, hora_inicio, anterior, chegada):
+        grafo = roteador.compacto
+        self.origem = origem
+        self.hora_inicio = hora_inicio
+        self._roteador = roteador
+        self._anterior = anterior
+        self._chegada = chegada
+
+        def nomear(estado):
+            estacao, linha = grafo.decompor(estado)
+            return (
+                grafo.estacoes[estacao],
+                grafo.nomes_linhas[linha] if linha >= 0 else None,
+            )
+
+        # Um estado pode ter mais de um rótulo (ver _busca_rotulos): vale o
+        # do melhor caminho até a sua estação, ou então o primeiro criado
+        self.predecessores = {}
+        rotulos = [r for estado in chegada.values() for r in self._cadeia(estado)]
+        for rotulo in itertools.chain(rotulos, anterior):
+            ligacao = anterior[rotulo]
+            self.predecessores.setdefault(
+                nomear(rotulo), nomear(ligacao[0]) if ligacao else None
+            )
+        self.chegada = {
+            grafo.estacoes[estacao]: nomear(estado) for estacao, estado in chegada.items()
+        }
+        self.tempos = {}
+        for estacao, estado in chegada.items():
+            # Soma do fim para o início, como em _montar_resultado
+            tempo = 0
+            for rotulo in self._cadeia(estado):
+                ligacao = anterior[rotulo]
+                if ligacao is not None:
+                    tempo = ligacao[1] + tempo
+            self.tempos[grafo.estacoes[estacao]] = tempo
+
+    def _cadeia(self, rotulo):
+        """Rótulos do caminho até o rótulo dado, do fim para o início."""
+        cadeia = [rotulo]
+        while self._anterior[cadeia[-1]] is not None:
+            cadeia.append(self._anterior[cadeia[-1]][0])
+        return cadeia
+
+    def caminho(self, destino):
+        """Reconstrói a rota até o destino como ResultadoRota, ou None se inalcançável."""
+        estacao = self._roteador.compacto.indice_estacao[destino]
+        if estacao not in self._chegada:
+            return None
+        resultado = self._roteador._montar_resultado(self._chegada[estacao], self._anterior)
+        return ResultadoRota(
+            origem=self.origem,
+            destino=destino,
+            hora_inicio=f"{self.hora_inicio:%H:%M}",
+            modo="menor",
+            **resultado,
+        )
+
 
 class RoteadorMetroLondres:
     """
     Classe principal que modela a rede de metrô, calcula e visualiza rotas.
-    Aplica Programação Dinâmica com recursão e memoization para encontrar
-    o caminho ótimo (mais curto ou mais longo) entre duas estações.
+    O caminho mais rápido sai de uma busca de rótulos sobre estados
+    (estação, linha de chegada), guardada em um CacheRotas entre consultas;
+    o mediano, da enumeração dos caminhos simples; e o mais longo, de um
+    branch-and-bound.
     """
 
-    def __init__(self, stations_data, edges_data):
+    def __init__(self, stations_data, edges_data, cache=None):
         self.stations = stations_data
-        self.graph = self._build_graph(edges_data)
-        self.memo = {}  # Cache para a memoization
+        self.velocidade_kmh = VELOCIDADE_TREM_KMH
+        # O grafo em dicionário só serve para montar o GrafoCompacto, que é a
+        # única representação guardada; os nomes ficam na fronteira da API
+        self._inicializar(GrafoCompacto(self._build_graph(edges_data)), cache)
+
+    @classmethod
+    def de_grafo_compacto(
+        cls, stations_data, compacto, velocidade_kmh=VELOCIDADE_TREM_KMH, cache=None
+    ):
+        """
+        Cria o roteador direto de um GrafoCompacto já montado, sem refazer a
+        leitura das arestas nem a fórmula de Haversine. Os motores só usam o
+        GrafoCompacto, então os resultados são idênticos aos do roteador
+        original.
+        """
+        roteador = cls.__new__(cls)
+        roteador.stations = stations_data
+        roteador.velocidade_kmh = velocidade_kmh
+        roteador._inicializar(compacto, cache)
+        return roteador
+
+    @property
+    def graph(self):
+        """
+        Grafo em dicionário {estação: [{vizinho, linha, distancia_km, tempo}, ...]},
+        na mesma ordem de conexões do GrafoCompacto. É montado a cada acesso
+        e não fica guardado no roteador: quem precisar dele várias vezes deve
+        manter a referência.
+        """
+        compacto = self.compacto
+        return {
+            nome: [
+                {
+                    "vizinho": compacto.estacoes[compacto.vizinhos[i]],
+                    "linha": compacto.nomes_linhas[compacto.linhas[i]],
+                    "distancia_km": compacto.distancias[i],
+                    "tempo": compacto.tempos[i],
+                }
+                for i in range(compacto.inicio[u], compacto.inicio[u + 1])
+            ]
+            for u, nome in enumerate(compacto.estacoes)
+        }
+
+    def _inicializar(self, compacto, cache):
+        """Estado comum aos construtores, depois de montado o grafo."""
+        self.compacto = compacto
+        # Cache das rotas mais rápidas; pode ser trocado por um CacheRotasLRU
+        self.memo = cache if cache is not None else CacheRotas()
+        self.nos_expandidos = 0  # Estados expandidos pela última busca
+        self.tabela_tempos = None  # Preenchida por construir_tabela_tempos()
+        self.hierarquias = None  # Preenchidas por construir_hierarquias()
+        self._matriz_distancias = None  # Preenchida por matriz_distancias()
 
     def _get_coords(self, estacao):
         # Retorna (lat, lon) para uma estação, aceitando value como dict ou lista.
@@ -55,8 +990,42 @@ class RoteadorMetroLondres:
                 graph[origem].append({"vizinho": destino, "linha": nome_linha})
                 graph[destino].append({"vizinho": origem, "linha": nome_linha})
 
+        # Distância e tempo de cada trecho são calculados aqui, uma única vez
+        # por par de estações, para que as buscas só leiam os pesos prontos.
+        distancias = {}
+        for origem, conexoes in graph.items():
+            for conexao in conexoes:
+                par = tuple(sorted((origem, conexao["vizinho"])))
+                if par not in distancias:
+                    distancias[par] = self._haversine(*par)
+                conexao["distancia_km"] = distancias[par]
+        self._atualizar_tempos_trecho(graph)
+
         return graph
 
+    def _atualizar_tempos_trecho(self, graph):
+        """Converte a distância de cada conexão em tempo de deslocamento (minutos)."""
+        for conexoes in graph.values():
+            for conexao in conexoes:
+                conexao["tempo"] = (conexao["distancia_km"] / self.velocidade_kmh) * 60
+
+    def recalcular_pesos(self, velocidade_kmh=None):
+        """
+        Refaz os tempos de deslocamento pré-calculados para uma nova velocidade
+        (por padrão, o valor atual de VELOCIDADE_TREM_KMH). As distâncias não
+        mudam, então não há nova chamada à fórmula de Haversine.
+        """
+        self.velocidade_kmh = (
+            velocidade_kmh if velocidade_kmh is not None else VELOCIDADE_TREM_KMH
+        )
+        self.compacto.atualizar_tempos(self.velocidade_kmh)
+        # A tabela e as hierarquias pré-calculadas deixam de valer;
+        # reconstrua se necessário
+        self.tabela_tempos = None
+        self.hierarquias = None
+        # As rotas em cache foram calculadas com os pesos antigos
+        self.memo.limpar()
+
     def _haversine(self, estacao1, estacao2):
         """Calcula a distância em km entre duas estações usando a fórmula de Haversine."""
         R = 6371  # Raio da Terra em km
@@ -73,83 +1042,1532 @@ class RoteadorMetroLondres:
         )
         c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
-        return R * c
+        return R * c
+
+    def matriz_distancias(self, caminho_arquivo=None):
+        """
+        Calcula, em uma única passada vetorizada com NumPy, a matriz de
+        distâncias de Haversine (km) entre todas as estações, em float32.
+        A ordem das linhas/colunas é a de self.compacto.estacoes.
+        Se caminho_arquivo for informado, salva a matriz em formato .npy para
+        que outros processos a abram com carregar_matriz_distancias().
+        """
+        np = _importar_numpy()
+
+        if self._matriz_distancias is None:
+            R = 6371  # Raio da Terra em km
+            coords = np.array(
+                [self._get_coords(nome) for nome in self.compacto.estacoes],
+                dtype=np.float64,
+            )
+            phi = np.radians(coords[:, 0])
+            lam = np.radians(coords[:, 1])
+
+            delta_phi = phi[None, :] - phi[:, None]
+            delta_lambda = lam[None, :] - lam[:, None]
+            a = (
+                np.sin(delta_phi / 2) ** 2
+                + np.cos(phi)[:, None] * np.cos(phi)[None, :] * np.sin(delta_lambda / 2) ** 2
+            )
+            c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+            self._matriz_distancias = (R * c).astype(np.float32)
+
+        if caminho_arquivo is not None:
+            np.save(caminho_arquivo, self._matriz_distancias)
+        return self._matriz_distancias
+
+    @staticmethod
+    def carregar_matriz_distancias(caminho_arquivo, mmap=True):
+        """
+        Abre uma matriz salva por matriz_distancias(). Com mmap=True o arquivo
+        é mapeado em memória somente leitura, e vários processos compartilham
+        as mesmas páginas em vez de recalcular ou copiar a matriz.
+        """
+        np = _importar_numpy()
+        return np.load(caminho_arquivo, mmap_mode="r" if mmap else None)
+
+    def _get_tempo_espera(self, hora_atual):
+        """Calcula o tempo de espera na estação com base na hora do dia."""
+        return FAIXAS_ESPERA[self._get_faixa_espera(hora_atual)][2]
+
+    def _get_faixa_espera(self, hora_atual):
+        """Retorna o índice da faixa de FAIXAS_ESPERA que contém a hora informada."""
+        for indice, (hora_inicial, hora_final, _) in enumerate(FAIXAS_ESPERA):
+            if hora_inicial <= hora_atual.hour < hora_final:
+                return indice
+        raise ValueError(f"Hora fora das faixas de espera: {hora_atual:%H:%M}")
+
+    def _minutos_ate_fim_da_faixa(self, hora_atual):
+        """Minutos que faltam para a hora atual sair da sua faixa de espera."""
+        hora_final = FAIXAS_ESPERA[self._get_faixa_espera(hora_atual)][1]
+        minutos_do_dia = (
+            hora_atual.hour * 60
+            + hora_atual.minute
+            + (hora_atual.second + hora_atual.microsecond / 1e6) / 60
+        )
+        return hora_final * 60 - minutos_do_dia
+
+    def _termina_na_faixa(self, hora_atual, tempo):
+        """
+        Se um trajeto de `tempo` minutos partindo em hora_atual termina antes
+        de a faixa de espera acabar. Nesse caso todas as esperas do trajeto
+        são as da faixa da partida, e um resultado calculado para a faixa
+        (tabela, hierarquia, árvore ou outro horário) vale exatamente.
+        """
+        return tempo <= self._minutos_ate_fim_da_faixa(hora_atual) - FOLGA_FAIXA_MIN
+
+    def gerar_rotas(
+        self,
+        origem,
+        destino,
+        hora_inicio_str,
+        max_tempo=None,
+        max_trocas=None,
+        max_estacoes=None,
+    ):
+        """
+        Gera as rotas simples entre origem e destino uma a uma (ResultadoRota
+        com modo 'todas'), em ordem de busca em profundidade, sem montar a
+        lista completa. Quem consome pode parar a qualquer momento, e a
+        memória fica limitada ao caminho em exploração.
+
+        Filtros opcionais cortam a exploração assim que um caminho parcial
+        os ultrapassa: max_tempo (minutos), max_trocas e max_estacoes.
+        """
+        if origem not in self.stations or destino not in self.stations:
+            raise ValueError("Uma ou ambas as estações não existem nos dados fornecidos.")
+
+        hora_inicio = datetime.strptime(hora_inicio_str, "%H:%M")
+        grafo = self.compacto
+        caminhos = self._gerar_caminhos(
+            grafo.indice_estacao[origem],
+            grafo.indice_estacao[destino],
+            hora_inicio,
+            max_tempo,
+            max_trocas,
+            max_estacoes,
+        )
+        return (
+            ResultadoRota(
+                origem=origem,
+                destino=destino,
+                hora_inicio=hora_inicio_str,
+                modo="todas",
+                **caminho,
+            )
+            for caminho in caminhos
+        )
+
+    def _gerar_caminhos(
+        self,
+        estacao_origem,
+        alvo,
+        hora_inicio,
+        max_tempo=None,
+        max_trocas=None,
+        max_estacoes=None,
+        apenas_tempo=False,
+        prefixo=(),
+    ):
+        """
+        Busca em profundidade iterativa sobre o GrafoCompacto que produz os
+        caminhos simples (como dicts) um de cada vez. Mantém só a pilha do
+        caminho atual, sem guardar os caminhos já produzidos.
+        Com apenas_tempo=True produz só o tempo total de cada caminho.
+
+        Com um prefixo (posições CSR dos primeiros trechos, ver
+        _prefixos_de_busca), explora só a subárvore que começa por ele,
+        produzindo exatamente o trecho correspondente da sequência completa.
+        """
+        grafo = self.compacto
+        inicio, vizinhos, linhas = grafo.inicio, grafo.vizinhos, grafo.linhas
+        # Pequena folga: a poda soma os tempos do início para o fim e o total
+        # final é somado do fim para o início; o filtro exato é feito no final.
+        folga = 1e-9
+
+        if estacao_origem == alvo:
+            if apenas_tempo:
+                yield 0
+            else:
+                yield {"caminho": [grafo.estacoes[alvo]], "tempo": 0, "linhas": [], "trocas": 0}
+            return
+
+        # Pilhas paralelas descrevendo o caminho em exploração
+        caminho = [estacao_origem]
+        linhas_usadas = [-1]
+        trechos = [0.0]
+        horas = [hora_inicio]
+        esperas = [self._get_tempo_espera(hora_inicio)]
+        tempos_parciais = [0.0]
+        trocas_parciais = [0]
+        no_caminho = {estacao_origem}
+        # Até a profundidade do prefixo, cada nível só segue o trecho dado
+        raiz = len(prefixo) - 1
+        proxima_conexao = [prefixo[0] if prefixo else inicio[estacao_origem]]
+
+        while proxima_conexao:
+            atual = caminho[-1]
+            i = proxima_conexao[-1]
+            if prefixo and len(proxima_conexao) - 1 <= raiz and i != prefixo[len(proxima_conexao) - 1]:
+                break  # subárvore do prefixo esgotada
+            if i == inicio[atual + 1]:
+                # Todas as conexões exploradas: volta um passo
+                proxima_conexao.pop()
+                no_caminho.discard(caminho.pop())
+                linhas_usadas.pop()
+                trechos.pop()
+                horas.pop()
+                esperas.pop()
+                tempos_parciais.pop()
+                trocas_parciais.pop()
+                continue
+            proxima_conexao[-1] = i + 1
+
+            vizinho = vizinhos[i]
+            if vizinho in no_caminho:
+                continue
+            if max_estacoes is not None and len(caminho) + 1 > max_estacoes:
+                continue
+
+            linha_atual = linhas[i]
+            tempo_trecho, troca_de_linha = grafo.custo_trecho(esperas[-1], i, linhas_usadas[-1])
+
+            tempo_parcial = tempos_parciais[-1] + tempo_trecho
+            trocas = trocas_parciais[-1] + (1 if troca_de_linha else 0)
+            if max_trocas is not None and trocas > max_trocas:
+                continue
+            if max_tempo is not None and tempo_parcial > max_tempo + folga:
+                continue
+
+            if vizinho == alvo:
+                # Soma do fim para o início, como _montar_resultado
+                tempo = tempo_trecho
+                for trecho in reversed(trechos[1:]):
+                    tempo = trecho + tempo
+                if max_tempo is not None and tempo > max_tempo:
+                    continue
+                if apenas_tempo:
+                    yield tempo
+                    continue
+                yield {
+                    "caminho": [grafo.estacoes[e] for e in caminho]
+                    + [grafo.estacoes[alvo]],
+                    "tempo": tempo,
+                    "linhas": [grafo.nomes_linhas[linha] for linha in linhas_usadas[1:]]
+                    + [grafo.nomes_linhas[linha_atual]],
+                    "trocas": trocas,
+                }
+                continue
+
+            caminho.append(vizinho)
+            linhas_usadas.append(linha_atual)
+            trechos.append(tempo_trecho)
+            proxima_hora = horas[-1] + timedelta(minutes=tempo_trecho)
+            horas.append(proxima_hora)
+            esperas.append(self._get_tempo_espera(proxima_hora))
+            tempos_parciais.append(tempo_parcial)
+            trocas_parciais.append(trocas)
+            no_caminho.add(vizinho)
+            profundidade = len(caminho) - 1
+            proxima_conexao.append(prefixo[profundidade] if profundidade <= raiz else inicio[vizinho])
+
+    def _prefixos_de_busca(self, estacao_origem, alvo, profundidade):
+        """
+        Pontos de divisão da busca exaustiva: as sequências de trechos
+        (posições CSR) com que os caminhos simples começam, na ordem em que a
+        busca em profundidade as visita. Cada uma tem `profundidade` trechos,
+        ou menos se já chegar ao destino; juntas, as subárvores cobrem todos
+        os caminhos exatamente uma vez.
+        """
+        grafo = self.compacto
+        prefixos = []
+
+        def expandir(estacao, trechos, visitadas):
+            for i in range(grafo.inicio[estacao], grafo.inicio[estacao + 1]):
+                vizinho = grafo.vizinhos[i]
+                if vizinho in visitadas:
+                    continue
+                if vizinho == alvo or len(trechos) + 1 == profundidade:
+                    prefixos.append(trechos + [i])
+                    continue
+                visitadas.add(vizinho)
+                expandir(vizinho, trechos + [i], visitadas)
+                visitadas.discard(vizinho)
+
+        expandir(estacao_origem, [], {estacao_origem})
+        return prefixos
+
+    def gerar_rotas_paralelo(
+        self,
+        origem,
+        destino,
+        hora_inicio_str,
+        workers=None,
+        profundidade=1,
+        max_tempo=None,
+        max_trocas=None,
+        max_estacoes=None,
+    ):
+        """
+        Lista completa das rotas simples de gerar_rotas(), com a busca dividida
+        nos primeiros `profundidade` trechos e cada subárvore enumerada em um
+        processo (ver _executor_compartilhado). As partes são juntadas na
+        ordem dos prefixos, então a lista é idêntica à da versão serial.
+        """
+        if origem not in self.stations or destino not in self.stations:
+            raise ValueError("Uma ou ambas as estações não existem nos dados fornecidos.")
+
+        hora_inicio = datetime.strptime(hora_inicio_str, "%H:%M")
+        filtros = (max_tempo, max_trocas, max_estacoes)
+        partes = self._enumerar_em_paralelo(
+            origem, destino, hora_inicio, filtros, workers, profundidade, "caminhos"
+        )
+        return [
+            ResultadoRota(
+                origem=origem,
+                destino=destino,
+                hora_inicio=hora_inicio_str,
+                modo="todas",
+                **caminho,
+            )
+            for _, parte in partes
+            for caminho in parte
+        ]
+
+    def calcular_rota_paralela(
+        self, origem, destino, hora_inicio_str, modo="medio", workers=None, profundidade=1
+    ):
+        """
+        calcular_rota() para os modos 'medio' e 'maior' pela enumeração
+        exaustiva dividida entre processos, como em gerar_rotas_paralelo().
+        Os workers devolvem só estatísticas das suas subárvores (contagens e
+        amostras de tempos, para a mediana; o primeiro caminho de maior
+        tempo, para o máximo) e o resultado é idêntico ao da versão serial.
+        """
+        if origem not in self.stations or destino not in self.stations:
+            raise ValueError("Uma ou ambas as estações não existem nos dados fornecidos.")
+        if modo not in ("medio", "maior"):
+            raise ValueError(f"Modo '{modo}' inválido. Use 'medio' ou 'maior'.")
+
+        hora_inicio = datetime.strptime(hora_inicio_str, "%H:%M")
+        grafo = self.compacto
+        estacao_origem = grafo.indice_estacao[origem]
+        alvo = grafo.indice_estacao[destino]
+        sem_filtros = (None, None, None)
+
+        if modo == "maior":
+            partes = self._enumerar_em_paralelo(
+                origem, destino, hora_inicio, sem_filtros, workers, profundidade, "maior"
+            )
+            # Só um tempo estritamente maior troca o escolhido, como em max()
+            resultado = None
+            for _, parte in partes:
+                if parte is not None and (resultado is None or parte["tempo"] > resultado["tempo"]):
+                    resultado = parte
+        else:
+            resultado = self._caminho_mediano_paralelo(
+                estacao_origem, alvo, hora_inicio, workers, profundidade
+            )
+
+        if resultado is None:
+            return None
+        return ResultadoRota(
+            origem=origem,
+            destino=destino,
+            hora_inicio=hora_inicio_str,
+            modo=modo,
+            **resultado,
+        )
+
+    def _caminho_mediano_paralelo(
+        self, estacao_origem, alvo, hora_inicio, workers, profundidade
+    ):
+        """
+        _caminho_mediano com cada passada da seleção dividida pelos prefixos
+        entre os workers, que devolvem só a _ContagemFaixas da sua subárvore.
+        A última passada conta os empates com o tempo mediano por subárvore,
+        e só a subárvore que contém o escolhido é percorrida de novo.
+        """
+        grafo = self.compacto
+        if estacao_origem == alvo:
+            # Não há o que dividir: o único caminho é a própria estação
+            return self._caminho_mediano(
+                grafo.estacoes[estacao_origem], grafo.estacoes[alvo], hora_inicio
+            )
+
+        prefixos = [
+            tuple(prefixo)
+            for prefixo in self._prefixos_de_busca(estacao_origem, alvo, profundidade)
+        ]
+        aleatorio = random.Random()
+        with self._executor_compartilhado(workers) as executor:
+
+            def contar(inferior, superior, cortes):
+                filtros = (None if superior == math.inf else superior, None, None)
+                produto = ("faixas", inferior, cortes)
+                contagem = _ContagemFaixas(inferior, cortes)
+                for parte in executor.map(
+                    _enumerar_subarvore_worker,
+                    [
+                        (estacao_origem, alvo, hora_inicio, filtros, prefixo, produto)
+                        for prefixo in prefixos
+                    ],
+                ):
+                    contagem.juntar(parte, aleatorio)
+                return contagem
+
+            mediana = _tempo_mediano(contar)
+            if mediana is None:
+                return None
+            tempo_mediano, empates_antes = mediana
+            filtros = (tempo_mediano, None, None)
+            produto = ("empates", tempo_mediano)
+            empates = list(
+                executor.map(
+                    _enumerar_subarvore_worker,
+                    [
+                        (estacao_origem, alvo, hora_inicio, filtros, prefixo, produto)
+                        for prefixo in prefixos
+                    ],
+                )
+            )
+
+        for prefixo, quantidade in zip(prefixos, empates):
+            if empates_antes >= quantidade:
+                empates_antes -= quantidade
+                continue
+            for caminho in self._gerar_caminhos(
+                estacao_origem, alvo, hora_inicio, max_tempo=tempo_mediano, prefixo=prefixo
+            ):
+                if caminho["tempo"] == tempo_mediano:
+                    if empates_antes == 0:
+                        return caminho
+                    empates_antes -= 1
+        return None
+
+    def _enumerar_em_paralelo(
+        self, origem, destino, hora_inicio, filtros, workers, profundidade, produto
+    ):
+        """
+        Divide a busca exaustiva pelos prefixos e devolve, na ordem deles,
+        pares (prefixo, produto da subárvore calculado nos workers), com
+        produto 'caminhos' (lista de dicts) ou 'maior' (primeiro caminho de
+        maior tempo, ou None).
+        """
+        grafo = self.compacto
+        estacao_origem = grafo.indice_estacao[origem]
+        alvo = grafo.indice_estacao[destino]
+        if estacao_origem == alvo:
+            # Não há o que dividir: o único caminho é a própria estação
+            produto_unico = _produto_da_subarvore(
+                self, estacao_origem, alvo, hora_inicio, filtros, (), produto
+            )
+            return [((), produto_unico)]
+
+        prefixos = [
+            tuple(prefixo)
+            for prefixo in self._prefixos_de_busca(estacao_origem, alvo, profundidade)
+        ]
+        with self._executor_compartilhado(workers) as executor:
+            produtos = executor.map(
+                _enumerar_subarvore_worker,
+                [
+                    (estacao_origem, alvo, hora_inicio, filtros, prefixo, produto)
+                    for prefixo in prefixos
+                ],
+            )
+            return list(zip(prefixos, produtos))
+
+    def _caminho_mediano(self, origem, destino, hora_inicio):
+        """
+        Caminho de tempo mediano (mediana inferior, elemento (n-1)//2 da lista
+        ordenada por tempo), sem guardar os caminhos nem os seus tempos.
+
+        1. Passadas do gerador só com os tempos acham o tempo mediano por
+           seleção em faixas (ver _tempo_mediano); a memória fica limitada a
+           algumas amostras de TAMANHO_AMOSTRA_MEDIANA tempos, e a partir da
+           segunda passada a busca é podada em max_tempo pelo topo da faixa.
+        2. Entre os caminhos com esse tempo, a posição do escolhido é a mesma
+           que uma ordenação estável daria; uma última passada, podada no
+           tempo mediano, para nele.
+        O resultado é idêntico ao de ordenar todos os caminhos.
+        """
+        grafo = self.compacto
+        estacao_origem = grafo.indice_estacao[origem]
+        alvo = grafo.indice_estacao[destino]
+        aleatorio = random.Random()
+
+        def contar(inferior, superior, cortes):
+            contagem = _ContagemFaixas(inferior, cortes)
+            for tempo in self._gerar_caminhos(
+                estacao_origem,
+                alvo,
+                hora_inicio,
+                max_tempo=None if superior == math.inf else superior,
+                apenas_tempo=True,
+            ):
+                contagem.adicionar(tempo, aleatorio)
+            return contagem
+
+        mediana = _tempo_mediano(contar)
+        if mediana is None:
+            return None
+        tempo_mediano, empates_antes = mediana
+
+        for caminho in self._gerar_caminhos(
+            estacao_origem, alvo, hora_inicio, max_tempo=tempo_mediano
+        ):
+            if caminho["tempo"] == tempo_mediano:
+                if empates_antes == 0:
+                    return caminho
+                empates_antes -= 1
+        return None
+
+    def rota_mais_longa(
+        self, origem, destino, hora_inicio_str, limite_nos=None, limite_tempo_s=None
+    ):
+        """
+        Rota simples mais demorada (modo 'maior', roteiro turístico) por
+        branch-and-bound, com orçamento opcional de nós expandidos
+        (limite_nos) e de tempo de relógio em segundos (limite_tempo_s).
+
+        Retorna (resultado, completo): resultado é o melhor ResultadoRota
+        encontrado até então (ou None) e completo indica se a busca terminou
+        dentro do orçamento, caso em que o resultado é o ótimo exato.
+        """
+        if origem not in self.stations or destino not in self.stations:
+            raise ValueError("Uma ou ambas as estações não existem nos dados fornecidos.")
+
+        hora_inicio = datetime.strptime(hora_inicio_str, "%H:%M")
+        caminho, completo = self._caminho_mais_longo(
+            origem, destino, hora_inicio, limite_nos, limite_tempo_s
+        )
+        if caminho is None:
+            return None, completo
+        resultado = ResultadoRota(
+            origem=origem,
+            destino=destino,
+            hora_inicio=hora_inicio_str,
+            modo="maior",
+            completo=completo,
+            **caminho,
+        )
+        return resultado, completo
+
+    def _caminho_mais_longo(
+        self, origem, destino, hora_inicio, limite_nos=None, limite_tempo_s=None
+    ):
+        """
+        Busca em profundidade com poda (branch-and-bound) pelo caminho simples
+        de maior tempo. Um ramo é descartado quando o destino ficou
+        inalcançável ou quando nem o limite superior do que ainda dá para
+        somar supera a melhor rota já encontrada (ver _limite_superior).
+
+        A ordem de exploração é a mesma de _gerar_caminhos e só um tempo
+        estritamente maior troca a melhor rota, então, sem orçamento, o
+        resultado é idêntico ao de max() sobre todos os caminhos.
+        Retorna (caminho em dict ou None, completo).
+        """
+        grafo = self.compacto
+        inicio, vizinhos, linhas, tempos = (
+            grafo.inicio,
+            grafo.vizinhos,
+            grafo.linhas,
+            grafo.tempos,
+        )
+        estacao_origem = grafo.indice_estacao[origem]
+        alvo = grafo.indice_estacao[destino]
+        if estacao_origem == alvo:
+            return {"caminho": [destino], "tempo": 0, "linhas": [], "trocas": 0}, True
+
+        # Maior custo possível para entrar em cada estação por algum trecho
+        maior_espera = max(espera for _, _, espera in FAIXAS_ESPERA)
+        maior_entrada = [0.0] * len(grafo.estacoes)
+        for i, vizinho in enumerate(vizinhos):
+            custo = maior_espera + tempos[i] + PENALIDADE_TROCA_LINHA_MIN
+            maior_entrada[vizinho] = max(maior_entrada[vizinho], custo)
+
+        # Folga para a diferença de arredondamento entre somar do início para
+        # o fim (limite) e do fim para o início (tempo final)
+        folga = 1e-9
+        melhor_tempo = -math.inf
+        melhor_caminho = None
+        nos_expandidos = 0
+        prazo = time.perf_counter() + limite_tempo_s if limite_tempo_s is not None else None
+
+        if self._limite_superior(estacao_origem, alvo, {estacao_origem}, maior_entrada) is None:
+            return None, True
+
+        # Pilhas paralelas descrevendo o caminho em exploração
+        caminho = [estacao_origem]
+        trechos_usados = [-1]
+        tempos_trecho = [0.0]
+        horas = [hora_inicio]
+        esperas = [self._get_tempo_espera(hora_inicio)]
+        tempos_parciais = [0.0]
+        no_caminho = {estacao_origem}
+        proxima_conexao = [inicio[estacao_origem]]
+
+        while proxima_conexao:
+            atual = caminho[-1]
+            i = proxima_conexao[-1]
+            if i == inicio[atual + 1]:
+                # Todas as conexões exploradas: volta um passo
+                proxima_conexao.pop()
+                no_caminho.discard(caminho.pop())
+                trechos_usados.pop()
+                tempos_trecho.pop()
+                horas.pop()
+                esperas.pop()
+                tempos_parciais.pop()
+                continue
+            proxima_conexao[-1] = i + 1
+
+            vizinho = vizinhos[i]
+            if vizinho in no_caminho:
+                continue
+
+            # Orçamento esgotado: devolve a melhor rota encontrada até aqui
+            nos_expandidos += 1
+            if limite_nos is not None and nos_expandidos > limite_nos:
+                break
+            if prazo is not None and nos_expandidos % 256 == 0 and time.perf_counter() > prazo:
+                break
+
+            linha_anterior = linhas[trechos_usados[-1]] if trechos_usados[-1] >= 0 else -1
+            tempo_trecho, _ = grafo.custo_trecho(esperas[-1], i, linha_anterior)
+            tempo_parcial = tempos_parciais[-1] + tempo_trecho
+
+            if vizinho == alvo:
+                # Soma do fim para o início, como _montar_resultado
+                tempo = tempo_trecho
+                for trecho in reversed(tempos_trecho[1:]):
+                    tempo = trecho + tempo
+                if tempo > melhor_tempo:
+                    melhor_tempo = tempo
+                    melhor_caminho = trechos_usados[1:] + [i]
+                continue
+
+            no_caminho.add(vizinho)
+            restante = self._limite_superior(vizinho, alvo, no_caminho, maior_entrada)
+            if restante is None or tempo_parcial + restante + folga <= melhor_tempo:
+                no_caminho.discard(vizinho)
+                continue
+
+            caminho.append(vizinho)
+            trechos_usados.append(i)
+            tempos_trecho.append(tempo_trecho)
+            proxima_hora = horas[-1] + timedelta(minutes=tempo_trecho)
+            horas.append(proxima_hora)
+            esperas.append(self._get_tempo_espera(proxima_hora))
+            tempos_parciais.append(tempo_parcial)
+            proxima_conexao.append(inicio[vizinho])
+
+        self.nos_expandidos = nos_expandidos
+        completo = not proxima_conexao
+        if melhor_caminho is None:
+            return None, completo
+        return (
+            self._avaliar_trechos(estacao_origem, melhor_caminho, hora_inicio),
+            completo,
+        )
+
+    def _limite_superior(self, atual, alvo, no_caminho, maior_entrada):
+        """
+        Limite superior do tempo que ainda pode ser somado a partir da estação
+        atual: cada estação ainda alcançável (sem passar pelo caminho nem
+        atravessar o destino) entra no caminho no máximo uma vez, pelo seu
+        trecho de entrada mais caro. Retorna None se o destino é inalcançável.
+        """
+        inicio, vizinhos = self.compacto.inicio, self.compacto.vizinhos
+        vistas = {atual}
+        pendentes = [atual]
+        soma = 0.0
+        alcancou_destino = False
+        while pendentes:
+            u = pendentes.pop()
+            for i in range(inicio[u], inicio[u + 1]):
+                v = vizinhos[i]
+                if v in vistas or v in no_caminho:
+                    continue
+                vistas.add(v)
+                soma += maior_entrada[v]
+                if v == alvo:
+                    alcancou_destino = True
+                else:
+                    pendentes.append(v)
+        return soma if alcancou_destino else None
+
+    def _buscar_menor_tempo(self, origem, destino, hora_inicio, algoritmo="dijkstra"):
+        """
+        Busca de rótulos (Dijkstra) sobre estados (estação, linha de chegada).
+        Encontra o caminho mais rápido em tempo polinomial, sem enumerar
+        todos os caminhos simples como faz _gerar_caminhos.
+        Roda sobre o GrafoCompacto; os nomes só voltam no resultado final.
+
+        Com algoritmo="astar" a fila é ordenada por tempo + estimativa do
+        tempo restante (ver _estimativa_astar), o que expande bem menos
+        estados em trajetos longos. O total de estados expandidos fica em
+        self.nos_expandidos.
+
+        Com algoritmo="bidirecional" a busca parte da origem e do destino ao
+        mesmo tempo (ver _busca_bidirecional); se o trajeto atravessar a troca
+        de faixa de espera, refaz a busca só a partir da origem.
+        """
+        grafo = self.compacto
+        alvo = grafo.indice_estacao[destino]
+        if algoritmo == "bidirecional":
+            estacao_origem = grafo.indice_estacao[origem]
+            encontrado, custo, trechos = self._busca_bidirecional(
+                estacao_origem, alvo, self._get_tempo_espera(hora_inicio)
+            )
+            if not encontrado:
+                return None
+            if self._termina_na_faixa(hora_inicio, custo):
+                return self._avaliar_trechos(estacao_origem, trechos, hora_inicio)
+            nos_bidirecional = self.nos_expandidos
+            resultado = self._buscar_menor_tempo(origem, destino, hora_inicio)
+            self.nos_expandidos += nos_bidirecional
+            return resultado
+
+        estimativa = self._estimativa_astar(destino) if algoritmo == "astar" else None
+
+        anterior, chegada = self._busca_rotulos(
+            grafo.indice_estacao[origem], hora_inicio, alvo, estimativa
+        )
+        if alvo not in chegada:
+            return None
+        return self._montar_resultado(chegada[alvo], anterior)
+
+    def _busca_bidirecional(self, estacao_origem, alvo, espera):
+        """
+        Dijkstra bidirecional sobre estados (estação, linha de chegada), com a
+        espera constante da faixa de partida. A busca direta guarda o tempo
+        desde a origem; a reversa, o tempo que falta até o destino a partir
+        de cada estado, já incluindo a penalidade do próximo trecho. Como os
+        dois lados rotulam o mesmo estado, a soma no ponto de encontro conta
+        a troca de linha exatamente uma vez.
+
+        Retorna (encontrado, custo, trechos), com trechos em posições CSR.
+        O total de estados fixados pelos dois lados fica em self.nos_expandidos.
+        """
+        grafo = self.compacto
+        inicio, vizinhos, linhas, gemea = (
+            grafo.inicio,
+            grafo.vizinhos,
+            grafo.linhas,
+            grafo.gemea,
+        )
+        self.nos_expandidos = 0
+        if estacao_origem == alvo:
+            return True, 0.0, []
+
+        estado_inicial = grafo.estado(estacao_origem, -1)
+        estados_finais = [grafo.estado(alvo, linha) for linha in grafo.linhas_da_estacao(alvo)]
+        distancias = ({estado_inicial: 0.0}, {estado: 0.0 for estado in estados_finais})
+        # Para cada estado, o estado vizinho e a posição CSR do trecho que os
+        # liga: o anterior na busca direta, o seguinte na reversa
+        ligacoes = ({estado_inicial: None}, {estado: None for estado in estados_finais})
+        filas = ([(0.0, estado_inicial)], [(0.0, estado) for estado in estados_finais])
+        finalizados = (set(), set())
+        melhor, encontro = math.inf, None
+
+        while filas[0] and filas[1]:
+            # Nenhum caminho ainda não visto pode ser mais curto que o melhor
+            if filas[0][0][0] + filas[1][0][0] >= melhor:
+                break
+            lado = 0 if filas[0][0][0] <= filas[1][0][0] else 1
+            custo, estado = heapq.heappop(filas[lado])
+            if estado in finalizados[lado]:
+                continue
+            finalizados[lado].add(estado)
+            self.nos_expandidos += 1
+
+            outro = distancias[1 - lado].get(estado)
+            if outro is not None and custo + outro < melhor:
+                melhor, encontro = custo + outro, estado
+
+            atual, linha_estado = grafo.decompor(estado)
+            if lado == 0:
+                # Sai do estado por qualquer trecho, pagando a troca de linha
+                vizinhanca = (
+                    (grafo.estado(vizinhos[i], linhas[i]), i, linha_estado)
+                    for i in range(inicio[atual], inicio[atual + 1])
+                )
+            elif linha_estado >= 0:
+                # Chega ao estado por um trecho u->atual da mesma linha,
+                # vindo de qualquer estado de u
+                vizinhanca = (
+                    (grafo.estado(vizinhos[j], linha_anterior), gemea[j], linha_anterior)
+                    for j in range(inicio[atual], inicio[atual + 1])
+                    if linhas[j] == linha_estado
+                    for linha_anterior in grafo.linhas_da_estacao(vizinhos[j])
+                )
+            else:
+                continue  # estados de partida não têm predecessores
+
+            for vizinho, i, linha_anterior in vizinhanca:
+                if vizinho in finalizados[lado]:
+                    continue
+                tempo_trecho, _ = grafo.custo_trecho(espera, i, linha_anterior)
+                novo_custo = custo + tempo_trecho
+                if novo_custo < distancias[lado].get(vizinho, math.inf):
+                    distancias[lado][vizinho] = novo_custo
+                    ligacoes[lado][vizinho] = (estado, i)
+                    heapq.heappush(filas[lado], (novo_custo, vizinho))
+
+        if encontro is None:
+            return False, math.inf, []
+
+        # Da origem ao encontro pela busca direta, e dele ao destino pela reversa
+        trechos = []
+        estado = encontro
+        while ligacoes[0][estado] is not None:
+            estado, i = ligacoes[0][estado]
+            trechos.append(i)
+        trechos.reverse()
+        estado = encontro
+        while ligacoes[1][estado] is not None:
+            estado, i = ligacoes[1][estado]
+            trechos.append(i)
+        return True, melhor, trechos
+
+    def construir_tabela_tempos(self):
+        """
+        Etapa offline: pré-calcula menores tempos e próximos trechos para
+        todos os pares de estações em cada faixa de espera (ver TabelaTempos).
+        Depois disso, as consultas 'menor' são respondidas por consulta à
+        tabela e desenrolar do caminho, sem nenhuma busca.
+        """
+        self.tabela_tempos = TabelaTempos(self.compacto)
+        return self.tabela_tempos
+
+    def construir_hierarquias(self, limite_testemunha=64):
+        """
+        Etapa offline opcional: contraction hierarchies por faixa de espera
+        (ver HierarquiaContracao). Ocupa espaço proporcional às arestas, e
+        não aos pares de estações como a TabelaTempos, por isso serve a
+        redes grandes; as consultas 'menor' passam a ser buscas
+        bidirecionais que só visitam os níveis mais altos da hierarquia.
+        """
+        self.hierarquias = [
+            HierarquiaContracao(self.compacto, espera, limite_testemunha)
+            for _, _, espera in FAIXAS_ESPERA
+        ]
+        return self.hierarquias
+
+    def _menor_tempo_por_hierarquia(self, origem, destino, hora_inicio):
+        """
+        Responde pelas hierarquias quando o trajeto termina dentro da faixa
+        de espera da partida, com o tempo recalculado trecho a trecho.
+        Retorna (resolvida, resultado), como _menor_tempo_por_tabela.
+        """
+        grafo = self.compacto
+        estacao_origem = grafo.indice_estacao[origem]
+        hierarquia = self.hierarquias[self._get_faixa_espera(hora_inicio)]
+        consulta = hierarquia.consultar(estacao_origem, grafo.indice_estacao[destino])
+        self.nos_expandidos = hierarquia.nos_expandidos
+        if consulta is None:
+            return True, None
+        custo, trechos = consulta
+        if not self._termina_na_faixa(hora_inicio, custo):
+            return False, None
+        return True, self._avaliar_trechos(estacao_origem, trechos, hora_inicio)
+
+    def _menor_tempo_por_tabela(self, origem, destino, hora_inicio):
+        """
+        Responde pela TabelaTempos quando o trajeto termina dentro da faixa de
+        espera da partida (aí todas as esperas são as da faixa).
+        Retorna (resolvida, resultado); resolvida é False se o trajeto
+        atravessar a troca de faixa e precisar de uma busca.
+        """
+        grafo = self.compacto
+        faixa = self._get_faixa_espera(hora_inicio)
+        consulta = self.tabela_tempos.consultar(
+            grafo, grafo.indice_estacao[origem], grafo.indice_estacao[destino], faixa
+        )
+        if consulta is None:
+            # Sem caminho em nenhuma faixa: o grafo é o mesmo
+            return True, None
+        tempo, trechos = consulta
+        if not self._termina_na_faixa(hora_inicio, tempo):
+            return False, None
+
+        caminho = [origem]
+        linhas = []
+        trocas = 0
+        linha_anterior = -1
+        for i in trechos:
+            linha_atual = grafo.linhas[i]
+            if linha_anterior >= 0 and linha_anterior != linha_atual:
+                trocas += 1
+            caminho.append(grafo.estacoes[grafo.vizinhos[i]])
+            linhas.append(grafo.nomes_linhas[linha_atual])
+            linha_anterior = linha_atual
+        resultado = {"caminho": caminho, "tempo": tempo, "linhas": linhas, "trocas": trocas}
+        return True, resultado
+
+    def _menor_tempo(self, origem, destino, hora_inicio, algoritmo="dijkstra"):
+        """
+        Caminho mais rápido: do cache de rotas, se a rota guardada para a
+        faixa ainda terminar dentro dela; senão pela TabelaTempos ou pelas
+        hierarquias de contração, se construídas, ou por busca.
+        """
+        chave = (origem, destino, self._get_faixa_espera(hora_inicio), algoritmo)
+        rota = self.memo.obter(
+            chave, self._minutos_ate_fim_da_faixa(hora_inicio) - FOLGA_FAIXA_MIN
+        )
+        if rota is not None:
+            self.nos_expandidos = 0
+        else:
+            rota = self._menor_tempo_sem_cache(origem, destino, hora_inicio, algoritmo)
+            if rota is None:
+                return None
+            # Rotas que atravessam a troca de faixa dependem do horário exato
+            if self._termina_na_faixa(hora_inicio, rota["tempo"]):
+                self.memo.guardar(chave, rota, rota["tempo"])
+        # Cópia das listas: quem recebe o resultado pode alterá-lo
+        return {**rota, "caminho": list(rota["caminho"]), "linhas": list(rota["linhas"])}
+
+    def _menor_tempo_sem_cache(self, origem, destino, hora_inicio, algoritmo="dijkstra"):
+        """Caminho mais rápido pela TabelaTempos, pelas hierarquias ou por busca."""
+        if self.tabela_tempos is not None:
+            resolvida, resultado = self._menor_tempo_por_tabela(origem, destino, hora_inicio)
+            if resolvida:
+                return resultado
+        elif self.hierarquias is not None:
+            resolvida, resultado = self._menor_tempo_por_hierarquia(origem, destino, hora_inicio)
+            if resolvida:
+                return resultado
+        return self._buscar_menor_tempo(origem, destino, hora_inicio, algoritmo)
+
+    def arvore_menores_tempos(self, origem, hora_inicio_str):
+        """
+        Calcula, em uma única busca, o menor tempo da origem até todas as
+        estações, partindo no horário informado, com as ligações de
+        predecessores para reconstruir cada caminho. Usa os mesmos custos de
+        trecho e a mesma PENALIDADE_TROCA_LINHA_MIN da busca ponto a ponto.
+        """
+        if origem not in self.stations:
+            raise ValueError(f"A estação '{origem}' não existe nos dados fornecidos.")
+
+        hora_inicio = datetime.strptime(hora_inicio_str, "%H:%M")
+        anterior, chegada = self._busca_rotulos(
+            self.compacto.indice_estacao[origem], hora_inicio
+        )
+        return ArvoreMenoresTempos(self, origem, hora_inicio, anterior, chegada)
+
+    def perfil_partidas(self, origem, destino, inicio_str, fim_str):
+        """
+        Perfil de partidas do caminho mais rápido: para cada minuto entre
+        inicio_str e fim_str (inclusive, no mesmo dia), o tempo de viagem e a
+        rota, agrupados em trechos consecutivos com a mesma rota e o mesmo
+        tempo.
+
+        Dentro de uma faixa de espera, enquanto o trajeto termina antes de a
+        faixa acabar, o tempo é o mesmo para qualquer partida; por isso uma
+        única busca cobre esse trecho inteiro. As partidas do fim da faixa,
+        cujo trajeto atravessa a troca, formam a cauda da faixa, coberta
+        por _cobrir_cauda_da_faixa com O(p log c) buscas para p tempos
+        distintos em uma cauda de c minutos. Se a monotonia da cauda não
+        puder ser garantida, ela é calculada minuto a minuto (até c buscas).
+
+        O tempo é exato para cada minuto da janela; em empates, a rota de um
+        trecho é uma das mais rápidas, não necessariamente a que
+        calcular_rota() daria naquele minuto. buscas conta as buscas feitas
+        (o cache de rotas não é usado aqui).
+        """
+        if origem not in self.stations or destino not in self.stations:
+            raise ValueError("Uma ou ambas as estações não existem nos dados fornecidos.")
+
+        meia_noite = datetime.strptime("00:00", "%H:%M")
+        inicio = datetime.strptime(inicio_str, "%H:%M")
+        fim = datetime.strptime(fim_str, "%H:%M")
+        if fim < inicio:
+            raise ValueError("O fim da janela de partidas deve ser depois do início.")
+
+        buscas = 0
+
+        def buscar(minuto):
+            nonlocal buscas
+            buscas += 1
+            hora = meia_noite + timedelta(minutes=minuto)
+            return self._menor_tempo_sem_cache(origem, destino, hora)
+
+        minuto_inicio = int((inicio - meia_noite).total_seconds()) // 60
+        minuto_fim = int((fim - meia_noite).total_seconds()) // 60
+        trechos = []
+        minuto = minuto_inicio
+        while minuto <= minuto_fim:
+            resultado = buscar(minuto)
+            if resultado is None:
+                # Sem caminho em nenhum horário: o grafo é o mesmo
+                return PerfilPartidas(origem, destino, [], buscas)
+
+            # Último minuto da faixa cujo trajeto ainda termina dentro dela
+            # (mesma regra de _termina_na_faixa); até ele a rota se repete
+            faixa = self._get_faixa_espera(meia_noite + timedelta(minutes=minuto))
+            fim_da_faixa = FAIXAS_ESPERA[faixa][1] * 60
+            ultimo_estavel = math.floor(fim_da_faixa - resultado["tempo"] - FOLGA_FAIXA_MIN)
+            if ultimo_estavel >= minuto:
+                ultimo = min(ultimo_estavel, minuto_fim)
+                self._acrescentar_trecho_perfil(
+                    trechos, origem, destino, minuto, ultimo, resultado
+                )
+            else:
+                ultimo = min(fim_da_faixa - 1, minuto_fim)
+                for primeiro, ultimo_trecho, rota in self._cobrir_cauda_da_faixa(
+                    buscar, faixa, minuto, resultado, ultimo
+                ):
+                    self._acrescentar_trecho_perfil(
+                        trechos, origem, destino, primeiro, ultimo_trecho, rota
+                    )
+            minuto = ultimo + 1
+        return PerfilPartidas(origem, destino, trechos, buscas)
+
+    def _cobrir_cauda_da_faixa(self, buscar, faixa, primeiro, resultado, ultimo):
+        """
+        Trechos (primeiro minuto, último minuto, rota) com o menor tempo de
+        cada partida entre primeiro e ultimo, minutos do fim da faixa cujo
+        trajeto atravessa a troca para a faixa seguinte.
+
+        Partir mais tarde só põe mais trechos na faixa seguinte, então o tempo
+        de cada caminho não aumenta se ela espera menos e não diminui se
+        espera mais; o menor tempo é monótono do mesmo jeito. Por isso, se
+        dois minutos têm o mesmo tempo, todos os minutos entre eles também
+        têm, e a cauda é dividida ao meio só onde os tempos diferem. A rota
+        do extremo de onde o tempo vem (o primeiro minuto se a espera cai, o
+        último se sobe) vale para o trecho todo.
+
+        A monotonia exige que nenhum trajeto chegue à faixa depois da
+        seguinte; se os tempos dos extremos não garantirem isso, cada minuto
+        da cauda tem a sua busca.
+        """
+        proxima = (faixa + 1) % len(FAIXAS_ESPERA)
+        # A faixa seguinte pode já ser a do dia seguinte
+        fim_da_seguinte = FAIXAS_ESPERA[proxima][1] * 60 + (24 * 60 if proxima <= faixa else 0)
+        espera_cai = FAIXAS_ESPERA[proxima][2] <= FAIXAS_ESPERA[faixa][2]
+
+        resultado_ultimo = resultado if ultimo == primeiro else buscar(ultimo)
+        folga = fim_da_seguinte - ultimo - FOLGA_FAIXA_MIN
+        if resultado["tempo"] >= folga or resultado_ultimo["tempo"] >= folga:
+            yield primeiro, primeiro, resultado
+            for minuto in range(primeiro + 1, ultimo):
+                yield minuto, minuto, buscar(minuto)
+            if ultimo > primeiro:
+                yield ultimo, ultimo, resultado_ultimo
+            return
+
+        # Intervalos [a, b] com resultados já calculados nos dois extremos;
+        # a pilha é desempilhada da esquerda para a direita
+        pendentes = [(primeiro, resultado, ultimo, resultado_ultimo)]
+        coberto_ate = primeiro - 1
+        while pendentes:
+            a, resultado_a, b, resultado_b = pendentes.pop()
+            if resultado_a["tempo"] == resultado_b["tempo"] or b - a <= 1:
+                if resultado_a["tempo"] == resultado_b["tempo"]:
+                    trechos = [(a, b, resultado_a if espera_cai else resultado_b)]
+                else:
+                    trechos = [(a, a, resultado_a), (b, b, resultado_b)]
+                for inicio, fim, rota in trechos:
+                    # Intervalos vizinhos compartilham o extremo
+                    inicio = max(inicio, coberto_ate + 1)
+                    if inicio <= fim:
+                        yield inicio, fim, rota
+                        coberto_ate = fim
+                continue
+            meio = (a + b) // 2
+            resultado_meio = buscar(meio)
+            pendentes.append((meio, resultado_meio, b, resultado_b))
+            pendentes.append((a, resultado_a, meio, resultado_meio))
+
+    def _acrescentar_trecho_perfil(
+        self, trechos, origem, destino, primeiro, ultimo, resultado
+    ):
+        """Estende o último trecho do perfil se a rota for a mesma; senão, abre outro."""
+        def formatar(minuto):
+            return f"{minuto // 60:02d}:{minuto % 60:02d}"
+
+        if trechos:
+            anterior = trechos[-1].resultado
+            if (
+                anterior.tempo == resultado["tempo"]
+                and anterior.caminho == resultado["caminho"]
+                and anterior.linhas == resultado["linhas"]
+            ):
+                trechos[-1].partida_fim = formatar(ultimo)
+                return
+        trechos.append(
+            TrechoPerfil(
+                partida_inicio=formatar(primeiro),
+                partida_fim=formatar(ultimo),
+                tempo=resultado["tempo"],
+                resultado=ResultadoRota(
+                    origem=origem,
+                    destino=destino,
+                    hora_inicio=formatar(primeiro),
+                    modo="menor",
+                    **resultado,
+                ),
+            )
+        )
+
+    def _busca_rotulos(
+        self,
+        estacao_origem,
+        hora_inicio,
+        alvo=None,
+        estimativa=None,
+        linha_inicial=-1,
+        bloqueadas=None,
+        trechos_bloqueados=None,
+    ):
+        """
+        Núcleo das buscas de menor tempo sobre o GrafoCompacto.
+        Expande estados (estação, linha de chegada) em ordem de tempo (mais a
+        estimativa, se houver) até fixar o alvo ou, sem alvo, toda a rede.
+
+        Para buscas parciais (como os desvios do algoritmo de Yen), a busca
+        pode partir já em uma linha (linha_inicial), sem entrar nas estações
+        em bloqueadas e sem usar as posições CSR em trechos_bloqueados.
+
+        Guardar só a chegada mais cedo em cada estado supõe que chegar mais
+        tarde nunca ajuda, o que deixa de valer quando a espera diminui na
+        troca de faixa (11:00 e meia-noite): quem chega logo depois da troca
+        pode sair antes de quem chegou logo antes. Isso só acontece com quem
+        chega antes da troca por menos do que a espera diminui; se a
+        primeira passada não fixou nenhum estado nessa janela, ela é exata.
+        Senão a busca é refeita por _expandir_rotulos_com_quedas, que mantém
+        os rótulos necessários.
+
+        Retorna (anterior, chegada): anterior liga cada rótulo ao seu
+        predecessor (rótulo, tempo do trecho, troca de linha, posição CSR) e
+        chegada indica, para cada estação alcançada, o rótulo pelo qual se
+        chega a ela mais cedo. Um rótulo é um estado (ver GrafoCompacto.estado)
+        ou, na segunda passada, uma cópia dele (ver GrafoCompacto.decompor).
+        """
+        argumentos = (
+            estacao_origem, hora_inicio, alvo, estimativa, linha_inicial,
+            bloqueadas, trechos_bloqueados,
+        )
+        anterior, chegada, tempos, horas_fixadas = self._expandir_rotulos(*argumentos)
+        if alvo is not None:
+            if alvo not in chegada:
+                return anterior, chegada
+            horizonte = tempos[chegada[alvo]]
+        else:
+            horizonte = max(tempos[rotulo] for rotulo in chegada.values())
+
+        quedas = self._quedas_de_espera(hora_inicio, hora_inicio + timedelta(minutes=horizonte))
+        if not any(
+            troca - timedelta(minutes=queda) < hora < troca
+            for troca, queda in quedas
+            for hora in horas_fixadas
+        ):
+            return anterior, chegada
+        nos_primeira_passada = self.nos_expandidos
+        anterior, chegada = self._expandir_rotulos_com_quedas(*argumentos, quedas, horizonte)
+        self.nos_expandidos += nos_primeira_passada
+        return anterior, chegada
+
+    def _quedas_de_espera(self, hora_inicio, hora_fim):
+        """
+        Trocas de faixa em (hora_inicio, hora_fim] em que a espera diminui,
+        como pares (hora da troca, quanto a espera diminui).
+        """
+        quedas = []
+        dia = hora_inicio.replace(hour=0, minute=0, second=0, microsecond=0)
+        while dia <= hora_fim:
+            for indice, (hora_inicial, _, espera) in enumerate(FAIXAS_ESPERA):
+                # A faixa anterior à primeira é a última, do dia anterior
+                espera_anterior = FAIXAS_ESPERA[indice - 1][2]
+                troca = dia + timedelta(hours=hora_inicial)
+                if espera < espera_anterior and hora_inicio < troca <= hora_fim:
+                    quedas.append((troca, espera_anterior - espera))
+            dia += timedelta(days=1)
+        return quedas
+
+    def _expandir_rotulos(
+        self,
+        estacao_origem,
+        hora_inicio,
+        alvo,
+        estimativa,
+        linha_inicial,
+        bloqueadas,
+        trechos_bloqueados,
+    ):
+        """
+        Primeira passada de _busca_rotulos: Dijkstra com um rótulo por
+        estado, o de chegada mais cedo. Retorna (anterior, chegada, tempos,
+        horas_fixadas), com tempos o tempo decorrido até cada estado e
+        horas_fixadas a hora de chegada de cada estado retirado da fila.
+        """
+        grafo = self.compacto
+        inicio, vizinhos, linhas = grafo.inicio, grafo.vizinhos, grafo.linhas
+
+        # A linha de chegada faz parte do estado porque a penalidade de troca
+        # depende dela: chegar mais cedo por outra linha pode sair mais caro.
+        estado_inicial = grafo.estado(estacao_origem, linha_inicial)
+        melhor_tempo = {estado_inicial: 0.0}
+        anterior = {estado_inicial: None}
+        chegada = {}
+        desempate = itertools.count()
+        fila = [(0.0, next(desempate), estado_inicial, hora_inicio, 0.0)]
+        finalizados = set()
+        horas_fixadas = []
+        self.nos_expandidos = 0
+
+        while fila:
+            _, _, estado, hora_atual, tempo = heapq.heappop(fila)
+            if estado in finalizados:
+                continue
+            finalizados.add(estado)
+            horas_fixadas.append(hora_atual)
+            self.nos_expandidos += 1
+
+            atual, linha_anterior = grafo.decompor(estado)
+            # O primeiro estado de cada estação retirado da fila é o ótimo
+            if atual not in chegada:
+                chegada[atual] = estado
+                if atual == alvo:
+                    break
+
+            tempo_espera = self._get_tempo_espera(hora_atual)
+            for i in range(inicio[atual], inicio[atual + 1]):
+                if trechos_bloqueados is not None and i in trechos_bloqueados:
+                    continue
+                if bloqueadas is not None and vizinhos[i] in bloqueadas:
+                    continue
+                linha_atual = linhas[i]
+                proximo = grafo.estado(vizinhos[i], linha_atual)
+                if proximo in finalizados:
+                    continue
+
+                tempo_trecho, troca_de_linha = grafo.custo_trecho(tempo_espera, i, linha_anterior)
+                novo_tempo = tempo + tempo_trecho
+                if novo_tempo < melhor_tempo.get(proximo, math.inf):
+                    melhor_tempo[proximo] = novo_tempo
+                    anterior[proximo] = (estado, tempo_trecho, troca_de_linha, i)
+                    proxima_hora = hora_atual + timedelta(minutes=tempo_trecho)
+                    prioridade = novo_tempo
+                    if estimativa is not None:
+                        prioridade += estimativa(vizinhos[i])
+                    heapq.heappush(
+                        fila,
+                        (prioridade, next(desempate), proximo, proxima_hora, novo_tempo),
+                    )
+
+        return anterior, chegada, melhor_tempo, horas_fixadas
+
+    def _expandir_rotulos_com_quedas(
+        self,
+        estacao_origem,
+        hora_inicio,
+        alvo,
+        estimativa,
+        linha_inicial,
+        bloqueadas,
+        trechos_bloqueados,
+        quedas,
+        horizonte,
+    ):
+        """
+        Segunda passada de _busca_rotulos, exata mesmo com quedas de espera
+        no caminho. O que um rótulo ainda pode fazer só depende da hora em
+        que ele sai da estação (chegada mais espera, a "prontidão"). Um
+        rótulo B que sai depois de A só alcança A se A chegar a uma estação
+        antes de uma queda e B depois dela, e cada queda devolve a B no
+        máximo o quanto a espera diminui. Então B é descartado só se não
+        chegar antes de A e sair depois de A por pelo menos a soma das
+        quedas que A ainda tem pela frente; senão os dois são mantidos, como
+        cópias do mesmo estado.
+
+        horizonte (minutos) é o tempo encontrado pela primeira passada, que
+        limita o ótimo: rótulos que chegam depois dele são descartados.
+        """
+        grafo = self.compacto
+        inicio, vizinhos, linhas = grafo.inicio, grafo.vizinhos, grafo.linhas
+        total_estados = grafo.total_estados
+
+        def margem(hora):
+            return sum(queda for troca, queda in quedas if hora < troca)
+
+        estado_inicial = grafo.estado(estacao_origem, linha_inicial)
+        # Por estado: (tempo, prontidão, margem, rótulo) dos rótulos mantidos
+        mantidos = {
+            estado_inicial: [
+                (0.0, self._get_tempo_espera(hora_inicio), margem(hora_inicio), estado_inicial)
+            ]
+        }
+        copias = {estado_inicial: 1}
+        descartados = set()
+        anterior = {estado_inicial: None}
+        chegada = {}
+        desempate = itertools.count()
+        fila = [(0.0, next(desempate), estado_inicial, hora_inicio, 0.0)]
+        self.nos_expandidos = 0
+
+        while fila:
+            _, _, rotulo, hora_atual, tempo = heapq.heappop(fila)
+            if rotulo in descartados:
+                continue
+            self.nos_expandidos += 1
+
+            atual, linha_anterior = grafo.decompor(rotulo)
+            # O primeiro rótulo de cada estação retirado da fila é o ótimo
+            if atual not in chegada:
+                chegada[atual] = rotulo
+                if atual == alvo:
+                    break
+
+            tempo_espera = self._get_tempo_espera(hora_atual)
+            for i in range(inicio[atual], inicio[atual + 1]):
+                if trechos_bloqueados is not None and i in trechos_bloqueados:
+                    continue
+                if bloqueadas is not None and vizinhos[i] in bloqueadas:
+                    continue
+                tempo_trecho, troca_de_linha = grafo.custo_trecho(tempo_espera, i, linha_anterior)
+                novo_tempo = tempo + tempo_trecho
+                if novo_tempo > horizonte:
+                    continue
+                proxima_hora = hora_atual + timedelta(minutes=tempo_trecho)
+                prontidao = novo_tempo + self._get_tempo_espera(proxima_hora)
+
+                proximo = grafo.estado(vizinhos[i], linhas[i])
+                do_estado = mantidos.setdefault(proximo, [])
+                if any(
+                    novo_tempo >= outro_tempo and prontidao >= outra + folga
+                    for outro_tempo, outra, folga, _ in do_estado
+                ):
+                    continue
+                nova_margem = margem(proxima_hora)
+                # O novo rótulo pode tornar dispensáveis os já mantidos
+                dispensaveis = [
+                    mantido
+                    for mantido in do_estado
+                    if mantido[0] >= novo_tempo and mantido[1] >= prontidao + nova_margem
+                ]
+                for mantido in dispensaveis:
+                    do_estado.remove(mantido)
+                    descartados.add(mantido[3])
+
+                copia = copias.get(proximo, 0)
+                copias[proximo] = copia + 1
+                novo_rotulo = proximo + copia * total_estados
+                do_estado.append((novo_tempo, prontidao, nova_margem, novo_rotulo))
+                anterior[novo_rotulo] = (rotulo, tempo_trecho, troca_de_linha, i)
+                prioridade = novo_tempo
+                if estimativa is not None:
+                    prioridade += estimativa(vizinhos[i])
+                heapq.heappush(
+                    fila,
+                    (prioridade, next(desempate), novo_rotulo, proxima_hora, novo_tempo),
+                )
+
+        return anterior, chegada
+
+    def k_melhores_rotas(self, origem, destino, hora_inicio_str, k):
+        """
+        As k rotas simples mais rápidas, em ordem crescente de tempo, pelo
+        algoritmo de Yen sobre o mesmo modelo de custo (esperas por faixa e
+        penalidade de troca de linha). Cada nova rota nasce de um desvio,
+        calculado com Dijkstra, a partir de um prefixo das rotas já aceitas,
+        então o conjunto completo de caminhos nunca é montado.
+        Retorna uma lista de ResultadoRota (modo 'k_melhores').
+        """
+        if origem not in self.stations or destino not in self.stations:
+            raise ValueError("Uma ou ambas as estações não existem nos dados fornecidos.")
+
+        grafo = self.compacto
+        hora_inicio = datetime.strptime(hora_inicio_str, "%H:%M")
+        estacao_origem = grafo.indice_estacao[origem]
+        alvo = grafo.indice_estacao[destino]
+
+        anterior, chegada = self._busca_rotulos(estacao_origem, hora_inicio, alvo)
+        if alvo not in chegada:
+            return []
+
+        # Cada rota é representada pela sequência de posições CSR percorridas.
+        # A primeira também passa pelo heap: toda rota aceita é a mais rápida
+        # entre as candidatas, e a lista sai em ordem crescente de tempo.
+        primeira = self._trechos_ate(chegada[alvo], anterior)
+        desempate = itertools.count()
+        tempo = self._avaliar_trechos(estacao_origem, primeira, hora_inicio)["tempo"]
+        candidatas = [(tempo, next(desempate), primeira)]
+        conhecidas = {tuple(primeira)}
+        aceitas = []
+
+        while candidatas and len(aceitas) < k:
+            aceitas.append(heapq.heappop(candidatas)[2])
+            if len(aceitas) == k:
+                break
+            ultima = aceitas[-1]
+            estacoes, horas, _, _ = self._percorrer_trechos(estacao_origem, ultima, hora_inicio)
+
+            for j in range(len(ultima)):
+                raiz = ultima[:j]
+                # Trechos que as rotas aceitas com a mesma raiz usam a seguir
+                trechos_bloqueados = {
+                    rota[j] for rota in aceitas if len(rota) > j and rota[:j] == raiz
+                }
+                linha_inicial = grafo.linhas[raiz[-1]] if raiz else -1
+                anterior, chegada = self._busca_rotulos(
+                    estacoes[j],
+                    horas[j],
+                    alvo,
+                    linha_inicial=linha_inicial,
+                    bloqueadas=set(estacoes[: j + 1]),
+                    trechos_bloqueados=trechos_bloqueados,
+                )
+                if alvo not in chegada:
+                    continue
+
+                rota = raiz + self._trechos_ate(chegada[alvo], anterior)
+                if tuple(rota) in conhecidas:
+                    continue
+                conhecidas.add(tuple(rota))
+                tempo = self._avaliar_trechos(estacao_origem, rota, hora_inicio)["tempo"]
+                heapq.heappush(candidatas, (tempo, next(desempate), rota))
 
-    def _get_tempo_deslocamento(self, estacao1, estacao2):
-        """Calcula o tempo de viagem em minutos entre duas estações."""
-        distancia_km = self._haversine(estacao1, estacao2)
-        return (distancia_km / VELOCIDADE_TREM_KMH) * 60
+        rotas = [
+            ResultadoRota(
+                origem=origem,
+                destino=destino,
+                hora_inicio=hora_inicio_str,
+                modo="k_melhores",
+                **self._avaliar_trechos(estacao_origem, rota, hora_inicio),
+            )
+            for rota in aceitas
+        ]
+        # Rotas de mesmo custo podem diferir no último bit, conforme a ordem
+        # em que os trechos foram somados; a ordenação estável só as acerta
+        rotas.sort(key=lambda rota: rota.tempo)
+        return rotas
 
-    def _get_tempo_espera(self, hora_atual):
-        """Calcula o tempo de espera na estação com base na hora do dia."""
-        if hora_atual.hour < 11:
-            return 1.5
-        elif hora_atual.hour >= 18:
-            return 2.0
-        else:
-            return 1.0
+    def _trechos_ate(self, estado_final, anterior):
+        """Posições CSR percorridas da origem da busca até o estado final."""
+        trechos = []
+        estado = estado_final
+        while anterior[estado] is not None:
+            estado, _, _, i = anterior[estado]
+            trechos.append(i)
+        trechos.reverse()
+        return trechos
 
-    def _encontrar_caminhos_recursivo(
-        self, atual, destino, visitados, hora_atual, linha_anterior
-    ):
+    def _percorrer_trechos(self, estacao_origem, trechos, hora_inicio):
         """
-        Função recursiva principal que explora todos os caminhos simples (sem ciclos).
-        Esta é a implementação da Programação Dinâmica com Memoization.
+        Segue os trechos a partir da origem. Retorna as estações visitadas, a
+        hora de chegada em cada uma, o tempo de cada trecho e o total de trocas.
         """
-        # 1. CONDIÇÃO DE PARADA (CASO BASE)
-        if atual == destino:
-            return [{"caminho": [destino], "tempo": 0, "linhas": [], "trocas": 0}]
+        grafo = self.compacto
+        estacoes = [estacao_origem]
+        horas = [hora_inicio]
+        tempos_trecho = []
+        trocas = 0
+        linha_anterior = -1
+        for i in trechos:
+            tempo_trecho, troca_de_linha = grafo.custo_trecho(
+                self._get_tempo_espera(horas[-1]), i, linha_anterior
+            )
+            tempos_trecho.append(tempo_trecho)
+            trocas += 1 if troca_de_linha else 0
+            horas.append(horas[-1] + timedelta(minutes=tempo_trecho))
+            estacoes.append(grafo.vizinhos[i])
+            linha_anterior = grafo.linhas[i]
+        return estacoes, horas, tempos_trecho, trocas
 
-        # 2. MEMOIZATION: Verifica se já calculamos este subproblema
-        # A chave do cache contém o estado essencial: (estação atual, nós já visitados)
-        estado = (atual, frozenset(visitados))
-        if estado in self.memo:
-            return self.memo[estado]
+    def _avaliar_trechos(self, estacao_origem, trechos, hora_inicio):
+        """Monta o resultado (caminho, tempo, linhas, trocas) de uma sequência de trechos."""
+        grafo = self.compacto
+        estacoes, _, tempos_trecho, trocas = self._percorrer_trechos(
+            estacao_origem, trechos, hora_inicio
+        )
 
-        # 3. PASSO RECURSIVO
-        caminhos_encontrados = []
-        novos_visitados = visitados | {atual}
+        # Soma do fim para o início, como _montar_resultado
+        tempo = 0
+        for tempo_trecho in reversed(tempos_trecho):
+            tempo = tempo_trecho + tempo
 
-        for conexao in self.graph[atual]:
-            vizinho = conexao["vizinho"]
-            linha_atual = conexao["linha"]
+        return {
+            "caminho": [grafo.estacoes[e] for e in estacoes],
+            "tempo": tempo,
+            "linhas": [grafo.nomes_linhas[grafo.linhas[i]] for i in trechos],
+            "trocas": trocas,
+        }
 
-            if vizinho not in visitados:
-                # Calcula os custos para este trecho
-                tempo_espera = self._get_tempo_espera(hora_atual)
-                tempo_deslocamento = self._get_tempo_deslocamento(atual, vizinho)
+    def _estimativa_astar(self, destino):
+        """
+        Limite inferior (admissível) do tempo que falta de cada estação até o
+        destino: a distância em linha reta (Haversine) percorrida na velocidade
+        do trem, mais a menor espera possível se ainda houver um trecho a fazer.
+        Nenhum caminho pelos trilhos é mais curto que a linha reta e cada
+        trecho paga ao menos uma espera, então a estimativa nunca superestima.
+        """
+        grafo = self.compacto
+        alvo = grafo.indice_estacao[destino]
+        menor_espera = min(espera for _, _, espera in FAIXAS_ESPERA)
+        calculadas = {alvo: 0.0}
 
-                troca_de_linha = (
-                    linha_anterior is not None and linha_anterior != linha_atual
-                )
-                penalidade = PENALIDADE_TROCA_LINHA_MIN if troca_de_linha else 0
+        def estimativa(estacao):
+            if estacao not in calculadas:
+                distancia_km = self._haversine(grafo.estacoes[estacao], destino)
+                calculadas[estacao] = (
+                    distancia_km / self.velocidade_kmh
+                ) * 60 + menor_espera
+            return calculadas[estacao]
 
-                tempo_trecho = tempo_espera + tempo_deslocamento + penalidade
+        return estimativa
 
-                # Chama a recursão para o próximo estado
-                proxima_hora = hora_atual + timedelta(minutes=tempo_trecho)
-                sub_caminhos = self._encontrar_caminhos_recursivo(
-                    vizinho, destino, novos_visitados, proxima_hora, linha_atual
-                )
+    def _montar_resultado(self, estado_final, anterior):
+        """
+        Reconstrói o caminho seguindo os predecessores a partir do estado final
+        e traduz os índices do GrafoCompacto de volta para nomes.
+        """
+        grafo = self.compacto
+        estacao_final, _ = grafo.decompor(estado_final)
+        caminho = [grafo.estacoes[estacao_final]]
+        linhas = []
+        trechos = []
+        trocas = 0
+        estado = estado_final
+        while anterior[estado] is not None:
+            estado_anterior, tempo_trecho, troca_de_linha, _ = anterior[estado]
+            estacao_anterior, _ = grafo.decompor(estado_anterior)
+            _, linha = grafo.decompor(estado)
+            caminho.append(grafo.estacoes[estacao_anterior])
+            linhas.append(grafo.nomes_linhas[linha])
+            trechos.append(tempo_trecho)
+            trocas += 1 if troca_de_linha else 0
+            estado = estado_anterior
+        caminho.reverse()
+        linhas.reverse()
+
+        # Soma do fim para o início, a mesma ordem de todos os motores, para
+        # que o total seja idêntico ao da enumeração exaustiva.
+        tempo = 0
+        for tempo_trecho in trechos:
+            tempo = tempo_trecho + tempo
+
+        return {"caminho": caminho, "tempo": tempo, "linhas": linhas, "trocas": trocas}
+
+    def visualizar_caminho(
+        self,
+        resultado,
+        caminho_arquivo="trajeto_metro_londes.html",
+        abrir_navegador=True,
+    ):
+        """
+        Cria um mapa interativo do trajeto de um ResultadoRota com a
+        biblioteca Folium, salva em caminho_arquivo e, se abrir_navegador for
+        True, abre no navegador. Não imprime nada; retorna o caminho absoluto
+        do arquivo.
+        """
+        import folium
+        import webbrowser
 
-                # Constrói o caminho completo a partir dos resultados dos subproblemas
-                for sub_caminho in sub_caminhos:
-                    caminho_completo = {
-                        "caminho": [atual] + sub_caminho["caminho"],
-                        "tempo": tempo_trecho + sub_caminho["tempo"],
-                        "linhas": [linha_atual] + sub_caminho["linhas"],
-                        "trocas": (1 if troca_de_linha else 0) + sub_caminho["trocas"],
-                    }
-                    caminhos_encontrados.append(caminho_completo)
-
-        # 4. ARMAZENA NO CACHE E RETORNA
-        self.memo[estado] = caminhos_encontrados
-        return caminhos_encontrados
-
-    def _visualizar_caminho(self, resultado):
-        """Cria um mapa interativo com o trajeto usando a biblioteca Folium."""
-        caminho = resultado["caminho"]
-        linhas = resultado["linhas"]
+        caminho = resultado.caminho
+        linhas = resultado.linhas
 
         # Cores para as linhas do metrô (pode adicionar mais)
         cores_linhas = {
@@ -194,61 +2612,1239 @@ class RoteadorMetroLondres:
             ).add_to(mapa)
 
         # Salva e abre o mapa
-        filepath = os.path.abspath("trajeto_metro_londes.html")
+        filepath = os.path.abspath(caminho_arquivo)
         mapa.save(filepath)
-        print(f"\n  Mapa gerado e salvo em: {filepath}")
-        webbrowser.open(f"file://{filepath}")
+        if abrir_navegador:
+            webbrowser.open(f"file://{filepath}")
+        return filepath
+
+    def imprimir_resultado(self, resultado):
+        """Apresenta no console uma rota calculada por calcular_rota()."""
+        print("Rota encontrada com sucesso!\n")
+        print(f"Tempo total: {resultado.tempo:.2f} minutos")
+        print(f"Caminho: {' → '.join(resultado.caminho)}")
+        print(f"Linhas: {' → '.join(resultado.linhas)}")
+        print(f"Trocas de linha: {resultado.trocas}")
+        if not resultado.completo:
+            print("Busca interrompida pelo orçamento: melhor rota encontrada até então.")
+
+    def _rota_por_modo(
+        self,
+        origem,
+        destino,
+        hora_inicio,
+        modo,
+        algoritmo="dijkstra",
+        limite_nos=LIMITE_NOS_MAIOR,
+        limite_tempo_s=None,
+    ):
+        """Escolhe o motor de cada modo e retorna o caminho (dict) ou None."""
+        # O caminho mais rápido sai direto do Dijkstra, o mediano da seleção
+        # por contagem e o mais longo do branch-and-bound, dentro do orçamento.
+        if modo == "menor":
+            return self._menor_tempo(origem, destino, hora_inicio, algoritmo)
+        if modo == "medio":
+            return self._caminho_mediano(origem, destino, hora_inicio)
+        caminho, completo = self._caminho_mais_longo(
+            origem, destino, hora_inicio, limite_nos, limite_tempo_s
+        )
+        if caminho is None:
+            return None
+        return {**caminho, "completo": completo}
+
+    def encontrar_caminhos_em_lote(
+        self, consultas, limite_nos=LIMITE_NOS_MAIOR, limite_tempo_s=None
+    ):
+        """
+        Responde várias consultas de uma vez, sem imprimir nada nem gerar mapas.
+        Cada consulta é uma tupla (origem, destino, hora_inicio_str, modo).
+
+        No modo 'menor', as consultas de uma mesma origem compartilham uma
+        única busca de origem única (árvore de menores tempos) por faixa de
+        espera; a árvore de uma faixa só é reaproveitada para destinos
+        alcançados antes de a faixa acabar, onde os tempos são exatamente os
+        mesmos. Os modos 'medio' e 'maior' usam os mesmos motores de
+        calcular_rota(), com o orçamento limite_nos/limite_tempo_s valendo
+        para cada consulta 'maior'.
+
+        Retorna uma lista, na ordem das consultas, de dicts com origem,
+        destino, hora_inicio, modo, resultado (ResultadoRota ou None) e erro
+        (ou None).
+        """
+        resultados = []
+        por_origem = {}
+        horas = {}
+        for indice, (origem, destino, hora_inicio_str, modo) in enumerate(consultas):
+            item = {
+                "origem": origem,
+                "destino": destino,
+                "hora_inicio": hora_inicio_str,
+                "modo": modo,
+                "resultado": None,
+                "erro": None,
+            }
+            resultados.append(item)
+            if origem not in self.stations or destino not in self.stations:
+                item["erro"] = "Uma ou ambas as estações não existem nos dados fornecidos."
+            elif modo not in MODOS:
+                item["erro"] = f"Modo '{modo}' inválido. Use 'menor', 'medio' ou 'maior'."
+            else:
+                # Um horário malformado invalida só a sua consulta, e não o lote
+                try:
+                    horas[indice] = datetime.strptime(hora_inicio_str, "%H:%M")
+                except (TypeError, ValueError):
+                    item["erro"] = f"Horário '{hora_inicio_str}' inválido. Use HH:MM."
+                    continue
+                por_origem.setdefault(origem, []).append(indice)
+
+        # Agrupa por origem para descartar as árvores assim que a origem termina
+        for origem, indices in por_origem.items():
+            arvores_por_hora = {}
+            arvores_por_faixa = {}
+            for indice in indices:
+                item = resultados[indice]
+                hora_inicio = horas[indice]
+
+                if item["modo"] == "menor":
+                    resultado = self._menor_tempo_em_lote(
+                        origem,
+                        item["destino"],
+                        hora_inicio,
+                        arvores_por_hora,
+                        arvores_por_faixa,
+                    )
+                else:
+                    resultado = self._rota_por_modo(
+                        origem,
+                        item["destino"],
+                        hora_inicio,
+                        item["modo"],
+                        limite_nos=limite_nos,
+                        limite_tempo_s=limite_tempo_s,
+                    )
+
+                if resultado is None:
+                    item["erro"] = "Nenhum caminho encontrado entre as estações."
+                else:
+                    item["resultado"] = ResultadoRota(
+                        origem=origem,
+                        destino=item["destino"],
+                        hora_inicio=item["hora_inicio"],
+                        modo=item["modo"],
+                        **resultado,
+                    )
+
+        return resultados
+
+    def encontrar_caminhos_em_lote_paralelo(
+        self,
+        consultas,
+        workers=None,
+        tarefas_por_worker=4,
+        limite_nos=LIMITE_NOS_MAIOR,
+        limite_tempo_s=None,
+    ):
+        """
+        Mesmo contrato de encontrar_caminhos_em_lote(), com as consultas
+        divididas por origem entre processos de um ProcessPoolExecutor, para
+        usar todos os núcleos apesar do GIL.
+
+        O roteador não é serializado por tarefa: os arrays do GrafoCompacto
+        (e da TabelaTempos, se construída) vão uma única vez para um bloco de
+        memória compartilhada, e cada worker monta o seu roteador com views
+        sobre esse bloco (ver _executor_compartilhado). As consultas de uma
+        mesma origem ficam na mesma tarefa, para reaproveitar as árvores.
+        """
+        consultas = list(consultas)
+        workers = workers or os.cpu_count() or 1
+
+        # Distribui as origens, da mais carregada para a menos, sempre para a
+        # tarefa com menos consultas até o momento
+        por_origem = {}
+        for indice, consulta in enumerate(consultas):
+            por_origem.setdefault(consulta[0], []).append(indice)
+        tarefas = [[] for _ in range(min(len(por_origem), workers * tarefas_por_worker))]
+        for indices in sorted(por_origem.values(), key=len, reverse=True):
+            min(tarefas, key=len).extend(indices)
+
+        resultados = [None] * len(consultas)
+        with self._executor_compartilhado(workers) as executor:
+            parciais = executor.map(
+                _resolver_lote_worker,
+                [
+                    ([consultas[i] for i in indices], limite_nos, limite_tempo_s)
+                    for indices in tarefas
+                ],
+            )
+            for indices, itens in zip(tarefas, parciais):
+                for indice, item in zip(indices, itens):
+                    resultados[indice] = item
+        return resultados
+
+    @contextmanager
+    def _executor_compartilhado(self, workers=None):
+        """
+        ProcessPoolExecutor cujos workers montam, uma única vez cada, uma cópia
+        deste roteador com views sobre um bloco de memória compartilhada que
+        guarda os arrays do GrafoCompacto e da TabelaTempos (ver
+        _iniciar_worker). O bloco é liberado ao sair do bloco with.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import shared_memory
+
+        arrays = self._arrays_compartilhaveis()
+        layout, tamanho = _layout_arrays(arrays)
+        memoria = shared_memory.SharedMemory(create=True, size=max(tamanho, 1))
+        try:
+            with memoryview(memoria.buf) as buffer:
+                for nome, _, deslocamento, _ in layout:
+                    dados = arrays[nome].tobytes()
+                    buffer[deslocamento : deslocamento + len(dados)] = dados
+            metadados = self._metadados_compartilhaveis()
+            with ProcessPoolExecutor(
+                max_workers=workers or os.cpu_count() or 1,
+                initializer=_iniciar_worker,
+                initargs=(memoria.name, layout, metadados),
+            ) as executor:
+                yield executor
+        finally:
+            memoria.close()
+            memoria.unlink()
+
+    def _metadados_compartilhaveis(self):
+        """Dados não numéricos que acompanham _arrays_compartilhaveis (ver _montar_roteador)."""
+        return {
+            "estacoes": self.compacto.estacoes,
+            "nomes_linhas": self.compacto.nomes_linhas,
+            "stations": {nome: list(self._get_coords(nome)) for nome in self.stations},
+            "velocidade_kmh": self.velocidade_kmh,
+            "tabela": self.tabela_tempos is not None,
+        }
+
+    def salvar_snapshot(self, caminho_arquivo):
+        """
+        Grava a rede compilada em um arquivo binário versionado, para que
+        outros processos subam o roteador sem refazer _build_graph nem as
+        tabelas (ver carregar_snapshot). Formato:
+
+        - cabeçalho fixo: SNAPSHOT_MAGICO, versão e tamanho do cabeçalho JSON
+        - cabeçalho JSON: nomes das estações e linhas (os arrays só guardam
+          índices), coordenadas, velocidade, ordem de bytes e a posição de
+          cada array
+        - arrays do GrafoCompacto (CSR, distâncias e tempos) e, se
+          construída, da TabelaTempos, alinhados em 8 bytes
+        """
+        import json
+        import struct
+
+        arrays = self._arrays_compartilhaveis()
+        layout, _ = _layout_arrays(arrays)
+        cabecalho = dict(self._metadados_compartilhaveis())
+        cabecalho["ordem_bytes"] = sys.byteorder
+        cabecalho["layout"] = [
+            (nome, typecode, deslocamento, quantidade, array(typecode).itemsize)
+            for nome, typecode, deslocamento, quantidade in layout
+        ]
+        cabecalho_json = json.dumps(cabecalho, ensure_ascii=False).encode("utf-8")
+        fixo = struct.pack("<8sII", SNAPSHOT_MAGICO, SNAPSHOT_VERSAO, len(cabecalho_json))
+        inicio_dados = (len(fixo) + len(cabecalho_json) + 7) // 8 * 8
+
+        with open(caminho_arquivo, "wb") as arquivo:
+            arquivo.write(fixo + cabecalho_json)
+            for nome, _, deslocamento, _ in layout:
+                arquivo.write(b"\0" * (inicio_dados + deslocamento - arquivo.tell()))
+                arquivo.write(arrays[nome].tobytes())
+        return caminho_arquivo
+
+    @classmethod
+    def carregar_snapshot(cls, caminho_arquivo):
+        """
+        Sobe um roteador a partir de um arquivo de salvar_snapshot(). O arquivo
+        é mapeado em memória (mmap) e os arrays viram views sobre ele, sem
+        cópia nem desserialização: o custo é o de ler o cabeçalho e montar os
+        dicionários de nomes. O mapeamento é privado (cópia na escrita), então
+        recalcular_pesos() funciona sem alterar o arquivo.
+        """
+        import json
+        import mmap
+        import struct
+
+        with open(caminho_arquivo, "rb") as arquivo:
+            mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_COPY)
+
+        tamanho_fixo = struct.calcsize("<8sII")
+        if len(mapa) < tamanho_fixo:
+            raise ValueError(f"'{caminho_arquivo}' não é um snapshot do roteador.")
+        magico, versao, tamanho_cabecalho = struct.unpack_from("<8sII", mapa)
+        if magico != SNAPSHOT_MAGICO:
+            raise ValueError(f"'{caminho_arquivo}' não é um snapshot do roteador.")
+        if versao != SNAPSHOT_VERSAO:
+            raise ValueError(
+                f"Snapshot na versão {versao}; esta versão do roteador lê a {SNAPSHOT_VERSAO}."
+            )
+        cabecalho = json.loads(mapa[tamanho_fixo : tamanho_fixo + tamanho_cabecalho])
+        if cabecalho["ordem_bytes"] != sys.byteorder or any(
+            array(typecode).itemsize != tamanho
+            for _, typecode, _, _, tamanho in cabecalho["layout"]
+        ):
+            raise ValueError("Snapshot gravado em uma plataforma com outra representação binária.")
+
+        inicio_dados = (tamanho_fixo + tamanho_cabecalho + 7) // 8 * 8
+        layout = [
+            (nome, typecode, inicio_dados + deslocamento, quantidade)
+            for nome, typecode, deslocamento, quantidade, _ in cabecalho["layout"]
+        ]
+        roteador = _montar_roteador(_views_do_layout(memoryview(mapa), layout), cabecalho)
+        # O mapeamento precisa continuar aberto enquanto houver views sobre ele
+        roteador._snapshot = mapa
+        return roteador
+
+    def _arrays_compartilhaveis(self):
+        """Arrays numéricos que os workers precisam para remontar o roteador."""
+        grafo = self.compacto
+        arrays = {
+            "inicio": grafo.inicio,
+            "vizinhos": grafo.vizinhos,
+            "linhas": grafo.linhas,
+            "distancias": grafo.distancias,
+            "tempos": grafo.tempos,
+            "gemea": grafo.gemea,
+        }
+        if self.tabela_tempos is not None:
+            for faixa in range(len(FAIXAS_ESPERA)):
+                arrays[f"tabela_tempos_{faixa}"] = self.tabela_tempos.tempos[faixa]
+                arrays[f"tabela_proximo_{faixa}"] = self.tabela_tempos.proximo_trecho[faixa]
+        return arrays
+
+    def _menor_tempo_em_lote(
+        self, origem, destino, hora_inicio, arvores_por_hora, arvores_por_faixa
+    ):
+        """Responde uma consulta 'menor' reaproveitando as árvores já calculadas da origem."""
+        if self.tabela_tempos is not None:
+            resolvida, resultado = self._menor_tempo_por_tabela(origem, destino, hora_inicio)
+            if resolvida:
+                return resultado
+
+        grafo = self.compacto
+        estacao_origem = grafo.indice_estacao[origem]
+        alvo = grafo.indice_estacao[destino]
+
+        # A árvore de cada faixa parte do início da faixa, onde há mais folga
+        # até a troca de espera. Para um destino alcançado antes do fim da
+        # faixa, o caminho e o tempo valem para qualquer partida dentro dela.
+        faixa = self._get_faixa_espera(hora_inicio)
+        if faixa not in arvores_por_faixa:
+            inicio_da_faixa = hora_inicio.replace(
+                hour=FAIXAS_ESPERA[faixa][0], minute=0, second=0, microsecond=0
+            )
+            arvores_por_faixa[faixa] = self._busca_rotulos(
+                estacao_origem, inicio_da_faixa
+            )
+        anterior, chegada = arvores_por_faixa[faixa]
+        if alvo not in chegada:
+            return None
+        resultado = self._montar_resultado(chegada[alvo], anterior)
+        if self._termina_na_faixa(hora_inicio, resultado["tempo"]):
+            return resultado
+
+        # O trajeto atravessa a troca de faixa: busca no horário exato
+        if hora_inicio not in arvores_por_hora:
+            arvores_por_hora[hora_inicio] = self._busca_rotulos(
+                estacao_origem, hora_inicio
+            )
+        anterior, chegada = arvores_por_hora[hora_inicio]
+        return self._montar_resultado(chegada[alvo], anterior)
+
+    def _validar_consulta(self, origem, destino, modo, algoritmo):
+        """Validações de entrada comuns às interfaces públicas (ValueError)."""
+        if origem not in self.stations or destino not in self.stations:
+            raise ValueError("Uma ou ambas as estações não existem nos dados fornecidos.")
+
+        if modo not in MODOS:
+            raise ValueError(f"Modo '{modo}' inválido. Use 'menor', 'medio' ou 'maior'.")
+
+        if algoritmo not in ALGORITMOS:
+            raise ValueError(
+                f"Algoritmo '{algoritmo}' inválido. Use 'dijkstra', 'astar' ou 'bidirecional'."
+            )
+
+    def calcular_rota(
+        self,
+        origem,
+        destino,
+        hora_inicio_str,
+        modo="menor",
+        algoritmo="dijkstra",
+        limite_nos=LIMITE_NOS_MAIOR,
+        limite_tempo_s=None,
+    ):
+        """
+        Cálculo puro da rota: não imprime, não grava arquivos e não abre o
+        navegador. Retorna um ResultadoRota, ou None se não houver caminho.
+        Entradas inválidas geram ValueError.
+        No modo 'menor', algoritmo pode ser 'dijkstra', 'astar' ou 'bidirecional'.
+        No modo 'maior', a busca para após limite_nos nós expandidos ou
+        limite_tempo_s segundos (None = sem limite) e devolve a melhor rota
+        encontrada, com completo=False se o orçamento acabou antes do fim.
+        """
+        self._validar_consulta(origem, destino, modo, algoritmo)
+        hora_inicio = datetime.strptime(hora_inicio_str, "%H:%M")
+
+        resultado_final = self._rota_por_modo(
+            origem, destino, hora_inicio, modo, algoritmo, limite_nos, limite_tempo_s
+        )
+        if resultado_final is None:
+            return None
+
+        return ResultadoRota(
+            origem=origem,
+            destino=destino,
+            hora_inicio=hora_inicio_str,
+            modo=modo,
+            **resultado_final,
+        )
 
-    def encontrar_caminho(self, origem, destino, hora_inicio_str, modo="menor"):
+    def encontrar_caminho(
+        self,
+        origem,
+        destino,
+        hora_inicio_str,
+        modo="menor",
+        algoritmo="dijkstra",
+        gerar_mapa=True,
+        limite_nos=LIMITE_NOS_MAIOR,
+        limite_tempo_s=None,
+    ):
         """
         Função principal que orquestra a busca pelo caminho.
-        É a interface pública para o usuário.
+        É a interface pública para o usuário: calcula a rota com
+        calcular_rota(), apresenta o resultado no console e, se gerar_mapa
+        for True, desenha o mapa e o abre no navegador.
         """
         print("-" * 50)
         print(f"Buscando rota de '{origem}' para '{destino}'")
         print(f"Hora de início: {hora_inicio_str} | Modo: {modo}")
         print("-" * 50)
 
-        # Validações de entrada
+        try:
+            resultado_final = self.calcular_rota(
+                origem, destino, hora_inicio_str, modo, algoritmo, limite_nos, limite_tempo_s
+            )
+        except ValueError as erro:
+            print(f"Erro: {erro}")
+            return None
+
+        if resultado_final is None:
+            print("Nenhum caminho encontrado entre as estações.")
+            return None
+
+        # Apresenta o resultado
+        self.imprimir_resultado(resultado_final)
+
+        # Gera o mapa
+        if gerar_mapa:
+            filepath = self.visualizar_caminho(resultado_final)
+            print(f"\n  Mapa gerado e salvo em: {filepath}")
+        return resultado_final
+
+
+class RoteadorAsync:
+    """
+    Fachada asyncio para o RoteadorMetroLondres: as buscas rodam em um
+    executor (por padrão, o de threads do loop), sem bloquear o loop.
+
+    Pedidos simultâneos iguais compartilham uma única busca. No modo
+    'menor', a chave é a faixa de espera, e não o minuto: o resultado de
+    quem chegou primeiro vale para os demais se o trajeto termina antes de
+    a faixa acabar nos dois horários (aí as esperas são as mesmas); senão o
+    pedido faz a sua própria busca. Nos modos 'medio' e 'maior' a chave é o
+    horário exato.
+
+    Cada pedido pode ter um timeout próprio; um pedido cancelado ou que
+    estourou o tempo não cancela a busca dos outros, e a busca só é
+    cancelada quando ninguém mais espera por ela (a thread já iniciada vai
+    até o fim, mas o resultado é descartado).
+    """
+
+    def __init__(self, roteador, executor=None):
+        self.roteador = roteador
+        self.executor = executor
+        self._em_andamento = {}  # chave -> (tarefa, pedidos esperando)
+        self.calculadas = 0
+        self.coalescidas = 0
+
+    async def calcular_rota(
+        self,
+        origem,
+        destino,
+        hora_inicio_str,
+        modo="menor",
+        algoritmo="dijkstra",
+        timeout=None,
+        limite_nos=LIMITE_NOS_MAIOR,
+        limite_tempo_s=None,
+    ):
+        """
+        Versão assíncrona de RoteadorMetroLondres.calcular_rota(), com timeout
+        opcional em segundos (asyncio.TimeoutError ao estourar) e o mesmo
+        orçamento limite_nos/limite_tempo_s do modo 'maior'. O timeout vale
+        para o pedido inteiro, mesmo quando ele espera por duas buscas.
+        """
+        self.roteador._validar_consulta(origem, destino, modo, algoritmo)
+        hora_inicio = datetime.strptime(hora_inicio_str, "%H:%M")
+        prazo = None if timeout is None else time.monotonic() + timeout
+        argumentos = (
+            origem, destino, hora_inicio_str, modo, algoritmo, limite_nos, limite_tempo_s
+        )
+
+        if modo == "menor":
+            faixa = self.roteador._get_faixa_espera(hora_inicio)
+            chave = (origem, destino, modo, algoritmo, "faixa", faixa)
+            resultado = await self._aguardar(chave, argumentos, timeout)
+            if resultado is None or resultado.hora_inicio == hora_inicio_str:
+                return resultado
+            if self._vale_para(resultado, hora_inicio):
+                return replace(resultado, hora_inicio=hora_inicio_str)
+
+        chave = (origem, destino, modo, algoritmo, "hora", hora_inicio_str)
+        if modo == "maior":
+            # Orçamentos diferentes podem dar rotas diferentes
+            chave += (limite_nos, limite_tempo_s)
+        # Só o que sobrou do prazo, se já houve uma espera pela busca da faixa
+        restante = None if prazo is None else max(prazo - time.monotonic(), 0)
+        return await self._aguardar(chave, argumentos, restante)
+
+    def _vale_para(self, resultado, hora_inicio):
+        """
+        Se o resultado calculado para outro horário da mesma faixa vale para
+        hora_inicio: o trajeto precisa terminar dentro da faixa partindo do
+        mais tarde dos dois horários (e, portanto, também do mais cedo).
+        """
+        hora_resultado = datetime.strptime(resultado.hora_inicio, "%H:%M")
+        mais_tarde = max(hora_resultado, hora_inicio)
+        return self.roteador._termina_na_faixa(mais_tarde, resultado.tempo)
+
+    async def _aguardar(self, chave, argumentos, timeout):
+        """Espera pela busca da chave, iniciando-a se ainda não houver uma."""
+        import asyncio
+
+        if chave in self._em_andamento:
+            self.coalescidas += 1
+        else:
+            loop = asyncio.get_running_loop()
+            futuro = loop.run_in_executor(
+                self.executor, self.roteador.calcular_rota, *argumentos
+            )
+            tarefa = asyncio.ensure_future(futuro)
+            self._em_andamento[chave] = [tarefa, 0]
+            tarefa.add_done_callback(lambda _: self._encerrar(chave, tarefa))
+            self.calculadas += 1
+
+        registro = self._em_andamento[chave]
+        tarefa = registro[0]
+        registro[1] += 1
+        try:
+            # shield: o timeout ou o cancelamento deste pedido não cancela a busca
+            resultado = await asyncio.wait_for(asyncio.shield(tarefa), timeout)
+        finally:
+            registro[1] -= 1
+            if registro[1] == 0 and not tarefa.done():
+                # Ninguém mais espera por esta busca
+                tarefa.cancel()
+                self._encerrar(chave, tarefa)
+        if resultado is None:
+            return None
+        # Cada pedido recebe a sua cópia: quem recebe pode alterar o resultado
+        return replace(resultado, caminho=list(resultado.caminho), linhas=list(resultado.linhas))
+
+    def _encerrar(self, chave, tarefa):
+        """Tira a busca da lista de buscas em andamento, se ainda for a mesma."""
+        registro = self._em_andamento.get(chave)
+        if registro is not None and registro[0] is tarefa:
+            del self._em_andamento[chave]
+
+    def estatisticas(self):
+        """Buscas iniciadas, pedidos que esperaram por uma busca já em andamento e buscas abertas."""
+        return {
+            "calculadas": self.calculadas,
+            "coalescidas": self.coalescidas,
+            "em_andamento": len(self._em_andamento),
+        }
+
+
+# --- Processamento paralelo: funções executadas nos processos workers ---
+
+# Roteador de cada worker, montado uma única vez por _iniciar_worker
+_roteador_do_worker = None
+
+
+def _layout_arrays(arrays):
+    """
+    Posição de cada array em um bloco contíguo de memória: lista de
+    (nome, typecode, deslocamento em bytes, quantidade) e o tamanho total.
+    Os deslocamentos são alinhados em 8 bytes para o memoryview.cast().
+    """
+    layout = []
+    deslocamento = 0
+    for nome, valores in arrays.items():
+        # array tem typecode; as views de memoryview, o format equivalente
+        typecode = getattr(valores, "typecode", None) or valores.format
+        layout.append((nome, typecode, deslocamento, len(valores)))
+        deslocamento += (len(valores) * valores.itemsize + 7) // 8 * 8
+    return layout, deslocamento
+
+
+def _views_do_layout(buffer, layout):
+    """Views tipadas (memoryview.cast, sem cópia) de cada array do layout no buffer."""
+    return {
+        nome: buffer[deslocamento : deslocamento + quantidade * array(typecode).itemsize].cast(typecode)
+        for nome, typecode, deslocamento, quantidade in layout
+    }
+
+
+def _montar_roteador(views, metadados):
+    """
+    Roteador montado sobre views de arrays já prontos (memória compartilhada
+    ou snapshot mapeado em memória), com os metadados de _metadados_compartilhaveis.
+    """
+    compacto = GrafoCompacto.de_arrays(
+        metadados["estacoes"],
+        metadados["nomes_linhas"],
+        views["inicio"],
+        views["vizinhos"],
+        views["linhas"],
+        views["distancias"],
+        views["tempos"],
+        views["gemea"],
+    )
+    roteador = RoteadorMetroLondres.de_grafo_compacto(
+        metadados["stations"], compacto, metadados["velocidade_kmh"]
+    )
+    if metadados["tabela"]:
+        faixas = range(len(FAIXAS_ESPERA))
+        roteador.tabela_tempos = TabelaTempos(
+            compacto,
+            tempos=[views[f"tabela_tempos_{faixa}"] for faixa in faixas],
+            proximo_trecho=[views[f"tabela_proximo_{faixa}"] for faixa in faixas],
+        )
+    return roteador
+
+
+def _iniciar_worker(nome_memoria, layout, metadados):
+    """
+    Inicializador dos workers: abre o bloco de memória compartilhada e monta
+    o roteador com views sobre ele, sem copiar os arrays.
+    """
+    from multiprocessing import shared_memory
+
+    global _roteador_do_worker
+    try:
+        memoria = shared_memory.SharedMemory(name=nome_memoria, track=False)
+    except TypeError:  # Python < 3.13 não tem o parâmetro track
+        memoria = shared_memory.SharedMemory(name=nome_memoria)
+
+    roteador = _montar_roteador(_views_do_layout(memoria.buf, layout), metadados)
+    # O bloco precisa continuar aberto enquanto o worker usar as views
+    roteador._memoria_compartilhada = memoria
+    _roteador_do_worker = roteador
+
+
+def _resolver_lote_worker(tarefa):
+    """Tarefa de um worker: resolve um grupo de consultas com o roteador local."""
+    consultas, limite_nos, limite_tempo_s = tarefa
+    return _roteador_do_worker.encontrar_caminhos_em_lote(
+        consultas, limite_nos, limite_tempo_s
+    )
+
+
+def _enumerar_subarvore_worker(tarefa):
+    """Tarefa de um worker: enumera a subárvore de um prefixo (ver _produto_da_subarvore)."""
+    return _produto_da_subarvore(_roteador_do_worker, *tarefa)
+
+
+def _produto_da_subarvore(roteador, estacao_origem, alvo, hora_inicio, filtros, prefixo, produto):
+    """
+    Produto da subárvore do prefixo: 'caminhos' (lista de dicts), 'maior'
+    (primeiro caminho de maior tempo, ou None) ou, para a seleção da
+    mediana, ('faixas', inferior, cortes) (a _ContagemFaixas dos tempos) e
+    ('empates', tempo) (quantos caminhos têm exatamente esse tempo).
+    """
+    max_tempo, max_trocas, max_estacoes = filtros
+    caminhos = roteador._gerar_caminhos(
+        estacao_origem,
+        alvo,
+        hora_inicio,
+        max_tempo,
+        max_trocas,
+        max_estacoes,
+        apenas_tempo=isinstance(produto, tuple),
+        prefixo=prefixo,
+    )
+    if produto == "caminhos":
+        return list(caminhos)
+    if produto == "maior":
+        maior = None
+        for caminho in caminhos:
+            if maior is None or caminho["tempo"] > maior["tempo"]:
+                maior = caminho
+        return maior
+    if produto[0] == "faixas":
+        _, inferior, cortes = produto
+        contagem = _ContagemFaixas(inferior, cortes)
+        aleatorio = random.Random()
+        for tempo in caminhos:
+            contagem.adicionar(tempo, aleatorio)
+        return contagem
+    return sum(1 for tempo in caminhos if tempo == produto[1])
+
+
+class QuadroHorarios:
+    """
+    Quadro de horários no estilo GTFS, guardado como conexões elementares:
+    cada partida de uma viagem de uma estação para a seguinte, em ordem de
+    horário de partida, como o Connection Scan percorre. Os horários são
+    minutos desde a meia-noite e podem passar de 24h (viagens da madrugada).
+    """
+
+    def __init__(self, viagens):
+        # viagens: {id_viagem: (linha, [(estação, chegada, partida), ...])}
+        self.linha_da_viagem = {}
+        conexoes = []
+        for viagem, (linha, paradas) in viagens.items():
+            self.linha_da_viagem[viagem] = linha
+            for (de, _, partida), (para, chegada, _) in zip(paradas, paradas[1:]):
+                conexoes.append((partida, chegada, len(conexoes), de, para, viagem))
+        # A ordem de inserção desempata conexões de mesmo horário, mantendo a
+        # sequência das paradas dentro de cada viagem
+        conexoes.sort()
+        self.conexoes = [
+            (partida, chegada, de, para, viagem)
+            for partida, chegada, _, de, para, viagem in conexoes
+        ]
+        self.partidas = array("d", (conexao[0] for conexao in self.conexoes))
+        self.viagens = viagens
+
+    def __len__(self):
+        return len(self.conexoes)
+
+    @classmethod
+    def gerar_por_frequencias(
+        cls, roteador, frequencias=None, inicio_servico="00:00", fim_servico="25:00"
+    ):
+        """
+        Gera o quadro a partir da rede do roteador: as sequências de estações
+        de cada linha saem dos pares de metro_dict e os tempos entre estações
+        são os mesmos trechos do grafo.
+
+        frequencias é um dict {linha: ((hora_inicial, hora_final, intervalo_min), ...)};
+        linhas ausentes usam o intervalo de 2x a espera de FAIXAS_ESPERA, cuja
+        espera média (meio intervalo) é a espera fixa do roteador por grafo.
+        O serviço parte dos terminais entre inicio_servico e fim_servico
+        ('HH:MM', podendo passar de 24h).
+        """
+        padrao = tuple(
+            (hora_inicial, hora_final, 2 * espera)
+            for hora_inicial, hora_final, espera in FAIXAS_ESPERA
+        )
+        frequencias = frequencias or {}
+        inicio = cls._minutos_do_horario(inicio_servico)
+        fim = cls._minutos_do_horario(fim_servico)
+
+        graph = roteador.graph
+        viagens = {}
+        for linha, sequencias in cls._sequencias_por_linha(graph).items():
+            faixas = frequencias.get(linha, padrao)
+            for numero, sequencia in enumerate(sequencias):
+                for sentido, estacoes in enumerate((sequencia, sequencia[::-1])):
+                    trechos = [
+                        cls._tempo_trecho(graph, de, para, linha)
+                        for de, para in zip(estacoes, estacoes[1:])
+                    ]
+                    partida = inicio
+                    while partida < fim:
+                        paradas = [(estacoes[0], partida, partida)]
+                        horario = partida
+                        for estacao, tempo in zip(estacoes[1:], trechos):
+                            horario += tempo
+                            paradas.append((estacao, horario, horario))
+                        viagens[f"{linha}-{numero}-{sentido}-{partida:g}"] = (linha, paradas)
+                        partida += cls._intervalo(faixas, partida)
+        return cls(viagens)
+
+    @staticmethod
+    def _sequencias_por_linha(graph):
+        """
+        Decompõe os trechos de cada linha em sequências de estações (trajetos
+        dos trens), começando pelos terminais, de forma que cada par de
+        metro_dict apareça em exatamente uma sequência.
+        """
+        pares_por_linha = {}
+        for origem, conexoes in graph.items():
+            for conexao in conexoes:
+                par = tuple(sorted((origem, conexao["vizinho"])))
+                pares = pares_por_linha.setdefault(conexao["linha"], {})
+                pares[par] = None
+
+        sequencias_por_linha = {}
+        for linha, pares in pares_por_linha.items():
+            adjacentes = {}
+            for indice, (a, b) in enumerate(pares):
+                adjacentes.setdefault(a, []).append((b, indice))
+                adjacentes.setdefault(b, []).append((a, indice))
+            usados = set()
+            # Terminais (grau ímpar) primeiro; sobram só ciclos
+            inicios = [e for e, vizinhos in adjacentes.items() if len(vizinhos) % 2]
+            inicios += list(adjacentes)
+            sequencias = []
+            for estacao in inicios:
+                while any(indice not in usados for _, indice in adjacentes[estacao]):
+                    sequencia = [estacao]
+                    atual = estacao
+                    while True:
+                        proximo = next(
+                            (
+                                (vizinho, indice)
+                                for vizinho, indice in adjacentes[atual]
+                                if indice not in usados
+                            ),
+                            None,
+                        )
+                        if proximo is None:
+                            break
+                        atual, indice = proximo
+                        usados.add(indice)
+                        sequencia.append(atual)
+                    sequencias.append(sequencia)
+            sequencias_por_linha[linha] = sequencias
+        return sequencias_por_linha
+
+    @staticmethod
+    def _tempo_trecho(graph, de, para, linha):
+        """Tempo de deslocamento do trecho do grafo entre duas estações de uma linha."""
+        for conexao in graph[de]:
+            if conexao["vizinho"] == para and conexao["linha"] == linha:
+                return conexao["tempo"]
+        raise ValueError(f"Trecho {de} - {para} não existe na linha {linha}.")
+
+    @staticmethod
+    def _intervalo(faixas, minuto):
+        """Intervalo entre partidas (minutos) vigente no minuto informado."""
+        hora = (minuto % (24 * 60)) / 60
+        for hora_inicial, hora_final, intervalo in faixas:
+            if hora_inicial <= hora < hora_final:
+                return intervalo
+        raise ValueError(f"Sem frequência definida para as {int(hora):02d}h.")
+
+    @staticmethod
+    def _minutos_do_horario(horario):
+        """Converte 'HH:MM' ou 'HH:MM:SS' (horas podem passar de 24) em minutos."""
+        partes = [int(parte) for parte in horario.strip().split(":")]
+        horas, minutos = partes[0], partes[1]
+        segundos = partes[2] if len(partes) > 2 else 0
+        return horas * 60 + minutos + segundos / 60
+
+    @staticmethod
+    def _horario_dos_minutos(minutos):
+        """Converte minutos desde a meia-noite em 'HH:MM:SS' do GTFS."""
+        segundos = round(minutos * 60)
+        return f"{segundos // 3600:02d}:{segundos // 60 % 60:02d}:{segundos % 60:02d}"
+
+    @classmethod
+    def carregar_csv(cls, diretorio):
+        """
+        Carrega um quadro de arquivos CSV no formato GTFS: trips.txt
+        (route_id, trip_id) e stop_times.txt (trip_id, arrival_time,
+        departure_time, stop_id, stop_sequence) são obrigatórios. Se houver
+        stops.txt, stop_name dá o nome da estação de cada stop_id; se houver
+        frequencies.txt (trip_id, start_time, end_time, headway_secs), a viagem
+        correspondente vira um modelo repetido a cada intervalo.
+        """
+        def ler(nome):
+            caminho = os.path.join(diretorio, nome)
+            if not os.path.exists(caminho):
+                return None
+            with open(caminho, newline="", encoding="utf-8") as arquivo:
+                return list(csv.DictReader(arquivo))
+
+        trips = ler("trips.txt")
+        stop_times = ler("stop_times.txt")
+        if trips is None or stop_times is None:
+            raise ValueError(
+                f"Quadro GTFS incompleto em '{diretorio}': trips.txt e stop_times.txt são obrigatórios."
+            )
+        nomes = {linha["stop_id"]: linha["stop_name"] for linha in ler("stops.txt") or []}
+        linha_da_viagem = {linha["trip_id"]: linha["route_id"] for linha in trips}
+
+        paradas_por_viagem = {}
+        for linha in stop_times:
+            paradas_por_viagem.setdefault(linha["trip_id"], []).append(
+                (
+                    int(linha["stop_sequence"]),
+                    nomes.get(linha["stop_id"], linha["stop_id"]),
+                    cls._minutos_do_horario(linha["arrival_time"]),
+                    cls._minutos_do_horario(linha["departure_time"]),
+                )
+            )
+
+        viagens = {}
+        for viagem, paradas in paradas_por_viagem.items():
+            paradas.sort()
+            viagens[viagem] = (
+                linha_da_viagem[viagem],
+                [(estacao, chegada, partida) for _, estacao, chegada, partida in paradas],
+            )
+
+        for linha in ler("frequencies.txt") or []:
+            rota, modelo = viagens.pop(linha["trip_id"])
+            deslocamento = modelo[0][2]
+            partida = cls._minutos_do_horario(linha["start_time"])
+            fim = cls._minutos_do_horario(linha["end_time"])
+            intervalo = int(linha["headway_secs"]) / 60
+            while partida < fim:
+                viagens[f"{linha['trip_id']}-{partida:g}"] = (
+                    rota,
+                    [
+                        (estacao, chegada - deslocamento + partida, saida - deslocamento + partida)
+                        for estacao, chegada, saida in modelo
+                    ],
+                )
+                partida += intervalo
+        return cls(viagens)
+
+    def salvar_csv(self, diretorio):
+        """Grava o quadro em stops.txt, routes.txt, trips.txt e stop_times.txt (GTFS)."""
+        os.makedirs(diretorio, exist_ok=True)
+
+        def gravar(nome, campos, linhas):
+            with open(os.path.join(diretorio, nome), "w", newline="", encoding="utf-8") as arquivo:
+                escritor = csv.writer(arquivo)
+                escritor.writerow(campos)
+                escritor.writerows(linhas)
+
+        estacoes = dict.fromkeys(
+            estacao for _, paradas in self.viagens.values() for estacao, _, _ in paradas
+        )
+        gravar("stops.txt", ("stop_id", "stop_name"), ((e, e) for e in estacoes))
+        gravar("routes.txt", ("route_id",), ((l,) for l in dict.fromkeys(self.linha_da_viagem.values())))
+        gravar(
+            "trips.txt",
+            ("route_id", "service_id", "trip_id"),
+            ((linha, "diario", viagem) for viagem, linha in self.linha_da_viagem.items()),
+        )
+        gravar(
+            "stop_times.txt",
+            ("trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence"),
+            (
+                (
+                    viagem,
+                    self._horario_dos_minutos(chegada),
+                    self._horario_dos_minutos(partida),
+                    estacao,
+                    sequencia,
+                )
+                for viagem, (_, paradas) in self.viagens.items()
+                for sequencia, (estacao, chegada, partida) in enumerate(paradas, start=1)
+            ),
+        )
+
+
+class RoteadorHorarios:
+    """
+    Roteador por quadro de horários: calcula a chegada mais cedo a partir das
+    partidas reais com o Connection Scan Algorithm, em vez das esperas fixas
+    de FAIXAS_ESPERA. Recebe os mesmos stations_coordinates_data/metro_dict
+    do RoteadorMetroLondres, para comparar os dois motores.
+
+    Sem quadro, gera um por frequências (QuadroHorarios.gerar_por_frequencias);
+    PENALIDADE_TROCA_LINHA_MIN vira o tempo mínimo para trocar de trem.
+    """
+
+    def __init__(self, stations_data, edges_data, quadro=None, frequencias=None):
+        self.base = RoteadorMetroLondres(stations_data, edges_data)
+        self.stations = self.base.stations
+        self.tempo_troca_min = PENALIDADE_TROCA_LINHA_MIN
+        self.quadro = (
+            quadro
+            if quadro is not None
+            else QuadroHorarios.gerar_por_frequencias(self.base, frequencias)
+        )
+        self.conexoes_varridas = 0
+
+    def calcular_rota(self, origem, destino, hora_inicio_str):
+        """
+        Rota de chegada mais cedo saindo da origem no horário informado.
+        Retorna um ResultadoRota (modo 'horarios', tempo = chegada - partida,
+        incluindo as esperas na plataforma) ou None se não houver viagem.
+        Entradas inválidas geram ValueError.
+        """
         if origem not in self.stations or destino not in self.stations:
-            print("Erro: Uma ou ambas as estações não existem nos dados fornecidos.")
-            return
+            raise ValueError("Uma ou ambas as estações não existem nos dados fornecidos.")
 
         hora_inicio = datetime.strptime(hora_inicio_str, "%H:%M")
+        partida = hora_inicio.hour * 60 + hora_inicio.minute
+        if origem == destino:
+            return ResultadoRota(
+                origem=origem,
+                destino=destino,
+                hora_inicio=hora_inicio_str,
+                modo="horarios",
+                caminho=[destino],
+                linhas=[],
+                tempo=0,
+                trocas=0,
+            )
 
-        todos_caminhos = self._encontrar_caminhos_recursivo(
-            origem, destino, set(), hora_inicio, None
+        embarques = self._varrer_conexoes(origem, destino, partida)
+        if embarques is None:
+            return None
+
+        caminho = [origem]
+        linhas = []
+        for inicio, fim in embarques:
+            viagem = self.quadro.conexoes[inicio][4]
+            linha = self.quadro.linha_da_viagem[viagem]
+            for indice in range(inicio, fim + 1):
+                conexao = self.quadro.conexoes[indice]
+                if conexao[4] == viagem:
+                    caminho.append(conexao[3])
+                    linhas.append(linha)
+        trocas = sum(1 for a, b in zip(linhas, linhas[1:]) if a != b)
+        chegada = self.quadro.conexoes[embarques[-1][1]][1]
+        return ResultadoRota(
+            origem=origem,
+            destino=destino,
+            hora_inicio=hora_inicio_str,
+            modo="horarios",
+            caminho=caminho,
+            linhas=linhas,
+            tempo=chegada - partida,
+            trocas=trocas,
         )
 
-        if not todos_caminhos:
-            print("Nenhum caminho encontrado entre as estações.")
-            return
+    def _varrer_conexoes(self, origem, destino, partida):
+        """
+        Connection Scan: percorre as conexões em ordem de partida a partir do
+        horário informado, marcando as viagens alcançáveis e a chegada mais
+        cedo em cada estação, e para quando nenhuma conexão pode mais
+        melhorar a chegada ao destino.
 
-        # Seleciona o caminho com base no modo ('menor', 'medio' ou 'maior')
-        if modo == "menor":
-            resultado_final = min(todos_caminhos, key=lambda x: x["tempo"])
-        elif modo == "maior":
-            resultado_final = max(todos_caminhos, key=lambda x: x["tempo"])
-        elif modo == "medio":
-            # Caminho mediano: ordena todos os caminhos por tempo e pega o do meio.
-            # Se houver um número par de caminhos, escolhemos o elemento (n-1)//2
-            # (mediana inferior) para retornar um caminho existente.
-            caminhos_ordenados = sorted(todos_caminhos, key=lambda x: x["tempo"])
-            idx = (len(caminhos_ordenados) - 1) // 2
-            resultado_final = caminhos_ordenados[idx]
-        else:
-            print(f" Modo '{modo}' inválido. Use 'menor', 'medio' ou 'maior'.")
-            return
+        Retorna a lista de embarques (índice da conexão de embarque, índice
+        da conexão de desembarque), da origem ao destino, ou None.
+        """
+        conexoes = self.quadro.conexoes
+        tempo_troca = self.tempo_troca_min
+        infinito = math.inf
+        chegada = {origem: partida}
+        # Na origem não há troca: o passageiro já está na plataforma
+        pronto = {origem: partida}
+        chegou_por = {}
+        embarque = {}
 
-        # Apresenta o resultado
-        print("Rota encontrada com sucesso!\n")
-        print(f"Tempo total: {resultado_final['tempo']:.2f} minutos")
-        print(f"Caminho: {' → '.join(resultado_final['caminho'])}")
-        print(f"Linhas: {' → '.join(resultado_final['linhas'])}")
-        print(f"Trocas de linha: {resultado_final['trocas']}")
+        primeira = bisect_left(self.quadro.partidas, partida)
+        varridas = 0
+        for indice in range(primeira, len(conexoes)):
+            saida, horario_chegada, de, para, viagem = conexoes[indice]
+            if saida >= chegada.get(destino, infinito):
+                break
+            varridas += 1
+            if viagem not in embarque:
+                if pronto.get(de, infinito) > saida:
+                    continue
+                embarque[viagem] = indice
+            if horario_chegada < chegada.get(para, infinito):
+                chegada[para] = horario_chegada
+                pronto[para] = horario_chegada + tempo_troca
+                chegou_por[para] = indice
+        self.conexoes_varridas = varridas
+
+        if destino not in chegou_por:
+            return None
+        embarques = []
+        estacao = destino
+        while estacao != origem:
+            fim = chegou_por[estacao]
+            inicio = embarque[conexoes[fim][4]]
+            embarques.append((inicio, fim))
+            estacao = conexoes[inicio][2]
+        embarques.reverse()
+        return embarques
 
-        # Gera o mapa
-        self._visualizar_caminho(resultado_final)
+
+# --- Servidor HTTP/JSON ---
+
+
+def criar_servidor_http(roteador, host="127.0.0.1", porta=8000):
+    """
+    Cria (sem iniciar) um servidor HTTP com respostas em JSON sobre um
+    roteador já carregado, uma thread por conexão:
+
+    - GET /rota?origem=...&destino=...&hora=HH:MM[&modo=...][&algoritmo=...]
+      [&limite_nos=...][&limite_tempo_s=...]
+      -> calcular_rota() como dict (404 se não houver caminho)
+    - POST /lote com {"consultas": [[origem, destino, hora, modo], ...]}
+      e, opcionalmente, "limite_nos" e "limite_tempo_s"
+      -> encontrar_caminhos_em_lote(), na ordem das consultas
+
+    O modo 'maior' sempre roda com orçamento (por padrão LIMITE_NOS_MAIOR
+    nós); o campo completo da resposta indica se a busca terminou.
+    - GET /arvore?origem=...&hora=HH:MM
+      -> arvore_menores_tempos(): tempo e caminho até cada estação
+
+    Entradas inválidas respondem 400 com {"erro": mensagem}. Use
+    serve_forever() para atender e shutdown() para parar.
+    """
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlsplit
+
+    class ErroRequisicao(Exception):
+        """Requisição malformada; vira uma resposta 400."""
+
+    def parametro(parametros, nome, padrao=None):
+        if nome in parametros:
+            return parametros[nome][-1]
+        if padrao is None:
+            raise ErroRequisicao(f"Parâmetro obrigatório ausente: {nome}")
+        return padrao
+
+    def orcamento(limite_nos, limite_tempo_s):
+        # Sem "sem limite" pela rede: um pedido não pode prender uma thread
+        try:
+            limite_nos = int(limite_nos)
+            limite_tempo_s = None if limite_tempo_s is None else float(limite_tempo_s)
+        except (TypeError, ValueError):
+            raise ErroRequisicao("limite_nos e limite_tempo_s devem ser números.") from None
+        if limite_nos <= 0 or (limite_tempo_s is not None and not limite_tempo_s > 0):
+            raise ErroRequisicao("limite_nos e limite_tempo_s devem ser positivos.")
+        return limite_nos, limite_tempo_s
+
+    def rota(parametros, _):
+        limite_nos, limite_tempo_s = orcamento(
+            parametro(parametros, "limite_nos", LIMITE_NOS_MAIOR),
+            parametros.get("limite_tempo_s", [None])[-1],
+        )
+        resultado = roteador.calcular_rota(
+            parametro(parametros, "origem"),
+            parametro(parametros, "destino"),
+            parametro(parametros, "hora"),
+            parametro(parametros, "modo", "menor"),
+            parametro(parametros, "algoritmo", "dijkstra"),
+            limite_nos,
+            limite_tempo_s,
+        )
+        if resultado is None:
+            return 404, {"erro": "Nenhum caminho encontrado entre as estações."}
+        return 200, resultado.como_dict()
+
+    def arvore(parametros, _):
+        arvore_tempos = roteador.arvore_menores_tempos(
+            parametro(parametros, "origem"), parametro(parametros, "hora")
+        )
+        return 200, {
+            "origem": arvore_tempos.origem,
+            "hora_inicio": f"{arvore_tempos.hora_inicio:%H:%M}",
+            "tempos": arvore_tempos.tempos,
+            "caminhos": {
+                destino: arvore_tempos.caminho(destino).caminho
+                for destino in arvore_tempos.tempos
+            },
+        }
+
+    def lote(_, corpo):
+        consultas = corpo.get("consultas") if isinstance(corpo, dict) else None
+        if not isinstance(consultas, list) or not all(
+            isinstance(consulta, list)
+            and len(consulta) == 4
+            and all(isinstance(campo, str) for campo in consulta)
+            for consulta in consultas
+        ):
+            raise ErroRequisicao(
+                'O corpo deve ser {"consultas": [[origem, destino, hora, modo], ...]}, '
+                "com os quatro campos em texto."
+            )
+        limite_nos, limite_tempo_s = orcamento(
+            corpo.get("limite_nos", LIMITE_NOS_MAIOR), corpo.get("limite_tempo_s")
+        )
+        itens = roteador.encontrar_caminhos_em_lote(
+            [tuple(c) for c in consultas], limite_nos, limite_tempo_s
+        )
+        for item in itens:
+            if item["resultado"] is not None:
+                item["resultado"] = item["resultado"].como_dict()
+        return 200, {"resultados": itens}
+
+    rotas_get = {"/rota": rota, "/arvore": arvore}
+    rotas_post = {"/lote": lote}
+
+    class ManipuladorRotas(BaseHTTPRequestHandler):
+        # HTTP/1.1 mantém a conexão aberta entre requisições do mesmo cliente;
+        # sem o Nagle, cabeçalho e corpo não esperam pelo ACK atrasado (~40 ms)
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            self._atender(rotas_get)
+
+        def do_POST(self):
+            self._atender(rotas_post)
+
+        def _atender(self, rotas):
+            url = urlsplit(self.path)
+            valor = self.headers.get("Content-Length")
+            try:
+                tamanho = int(valor or 0)
+                if tamanho < 0:
+                    raise ValueError(valor)
+            except ValueError:
+                # Sem o tamanho do corpo não há como achar a próxima requisição
+                self.close_connection = True
+                self._responder(400, {"erro": f"Content-Length inválido: {valor!r}"})
+                return
+            bruto = self.rfile.read(tamanho) if tamanho else b""
+            funcao = rotas.get(url.path)
+            if funcao is None:
+                self._responder(404, {"erro": f"Endpoint desconhecido: {url.path}"})
+                return
+            try:
+                corpo = json.loads(bruto) if bruto else None
+                status, dados = funcao(parse_qs(url.query), corpo)
+            except (ErroRequisicao, ValueError) as erro:
+                # json.JSONDecodeError também é um ValueError
+                status, dados = 400, {"erro": str(erro)}
+            except Exception as erro:  # noqa: BLE001 - o servidor não pode cair
+                status, dados = 500, {"erro": f"Erro interno: {erro}"}
+            self._responder(status, dados)
+
+        def _responder(self, status, dados):
+            corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, formato, *args):
+            if servidor.registrar_requisicoes:
+                super().log_message(formato, *args)
+
+    servidor = ThreadingHTTPServer((host, porta), ManipuladorRotas)
+    servidor.roteador = roteador
+    servidor.registrar_requisicoes = False
+    return servidor
+
+
+def servir(roteador, host="127.0.0.1", porta=8000):
+    """Atende requisições HTTP até Ctrl+C (ver criar_servidor_http)."""
+    servidor = criar_servidor_http(roteador, host, porta)
+    servidor.registrar_requisicoes = True
+    endereco, porta_real = servidor.server_address[:2]
+    print(f"Servidor de rotas em http://{endereco}:{porta_real} (Ctrl+C para parar)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
 
 
 # --- DADOS FORNECIDOS ---
@@ -284,6 +3880,13 @@ if __name__ == "__main__":
     # 1. Instancia o roteador com os dados
     roteador = RoteadorMetroLondres(stations_coordinates_data, metro_dict)
 
+    # Modo servidor: python CP2.py servidor [porta] [host]
+    if len(sys.argv) > 1 and sys.argv[1] == "servidor":
+        porta = int(sys.argv[2]) if len(sys.argv) > 2 else 8000
+        host = sys.argv[3] if len(sys.argv) > 3 else "127.0.0.1"
+        servir(roteador, host, porta)
+        sys.exit(0)
+
     # 2. Executa a busca pelo caminho mais RÁPIDO
     # Exemplo 1: Trajeto simples na mesma linha
     roteador.encontrar_caminho(
@@ -0,0 +1,82 @@
+"""
+Benchmark do tempo de inicialização a frio do CP2.
+
+Mede, em processos Python novos, quanto custa importar o módulo agora que
+folium e webbrowser só são carregados ao desenhar um mapa, comparando com o
+custo de também carregá-los (o que todo processo pagava antes). Também
+mostra o efeito em um pool de workers, onde cada processo paga o import,
+e compara montar o roteador a partir dos dados com carregá-lo de um
+snapshot binário (salvar_snapshot/carregar_snapshot).
+
+Uso: python benchmarks/bench_importacao.py [repeticoes] [workers]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CENARIOS = {
+    "import CP2 (folium sob demanda)": "import CP2",
+    "import CP2 + folium/webbrowser (como antes)": "import CP2, folium, webbrowser",
+    "CLI: roteador + calcular_rota": (
+        "import CP2; "
+        "r = CP2.RoteadorMetroLondres(CP2.stations_coordinates_data, CP2.metro_dict); "
+        "r.calcular_rota(\"King's Cross\", 'Victoria Station', '10:00')"
+    ),
+}
+
+
+def medir(codigo, repeticoes):
+    """Mediana, em ms, do tempo de parede de um processo que executa o código."""
+    amostras = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, check=True)
+        amostras.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(amostras)
+
+
+def medir_base(repeticoes):
+    """Custo de subir o interpretador sem importar nada."""
+    return medir("pass", repeticoes)
+
+
+if __name__ == "__main__":
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    # Snapshot com a TabelaTempos, para comparar com montar tudo do zero
+    sys.path.insert(0, RAIZ)
+    import CP2
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        snapshot = os.path.join(diretorio, "rede.snapshot")
+        roteador = CP2.RoteadorMetroLondres(CP2.stations_coordinates_data, CP2.metro_dict)
+        roteador.construir_tabela_tempos()
+        roteador.salvar_snapshot(snapshot)
+        CENARIOS["roteador + tabela montados dos dados"] = (
+            "import CP2; "
+            "r = CP2.RoteadorMetroLondres(CP2.stations_coordinates_data, CP2.metro_dict); "
+            "r.construir_tabela_tempos()"
+        )
+        CENARIOS["roteador + tabela carregados do snapshot"] = (
+            f"import CP2; CP2.RoteadorMetroLondres.carregar_snapshot({snapshot!r})"
+        )
+
+        base = medir_base(repeticoes)
+        print(f"Interpretador vazio: {base:.1f} ms (mediana de {repeticoes})")
+
+        resultados = {nome: medir(codigo, repeticoes) for nome, codigo in CENARIOS.items()}
+    for nome, ms in resultados.items():
+        print(f"{nome}: {ms:.1f} ms (+{ms - base:.1f} ms sobre o interpretador)")
+
+    antes = resultados["import CP2 + folium/webbrowser (como antes)"]
+    agora = resultados["import CP2 (folium sob demanda)"]
+    economia = antes - agora
+    print(f"\nEconomia por processo: {economia:.1f} ms ({economia / antes:.0%})")
+    print(f"Pool com {workers} workers: {economia * workers:.0f} ms de CPU a menos na subida")
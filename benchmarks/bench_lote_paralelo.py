@@ -0,0 +1,64 @@
+"""
+Benchmark do lote paralelo (encontrar_caminhos_em_lote_paralelo).
+
+Monta uma matriz origem-destino com todos os pares de estações, partidas a
+cada intervalo_min minutos e os três modos, e mede a vazão (consultas por
+segundo) do lote serial e do paralelo com 1, 2, 4, ... workers até o número
+pedido. Também confere que o paralelo devolve exatamente o mesmo que o serial.
+
+Uso: python benchmarks/bench_lote_paralelo.py [workers] [intervalo_min]
+"""
+
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import CP2  # noqa: E402
+
+
+def matriz_od(intervalo_min):
+    """Consultas (origem, destino, hora, modo) para todos os pares e horários."""
+    estacoes = list(CP2.stations_coordinates_data)
+    return [
+        (origem, destino, f"{m // 60:02d}:{m % 60:02d}", modo)
+        for origem in estacoes
+        for destino in estacoes
+        if origem != destino
+        for m in range(0, 24 * 60, intervalo_min)
+        for modo in CP2.MODOS
+    ]
+
+
+def medir(executar):
+    """Resultado e tempo de parede (s) de uma execução."""
+    inicio = time.perf_counter()
+    resultado = executar()
+    return resultado, time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else (os.cpu_count() or 1)
+    intervalo = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    roteador = CP2.RoteadorMetroLondres(CP2.stations_coordinates_data, CP2.metro_dict)
+    consultas = matriz_od(intervalo)
+    print(f"{len(consultas)} consultas, {os.cpu_count()} núcleos disponíveis")
+
+    esperado, segundos = medir(lambda: roteador.encontrar_caminhos_em_lote(consultas))
+    print(f"Serial: {segundos:.2f} s ({len(consultas) / segundos:.0f} consultas/s)")
+
+    workers = 1
+    while workers <= max_workers:
+        resultado, segundos_paralelo = medir(
+            lambda: roteador.encontrar_caminhos_em_lote_paralelo(consultas, workers=workers)
+        )
+        assert resultado == esperado, "o lote paralelo divergiu do serial"
+        print(
+            f"{workers} worker(s): {segundos_paralelo:.2f} s "
+            f"({len(consultas) / segundos_paralelo:.0f} consultas/s, "
+            f"{segundos / segundos_paralelo:.2f}x o serial)"
+        )
+        workers *= 2
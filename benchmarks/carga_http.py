@@ -0,0 +1,130 @@
+"""
+Gerador de carga para o servidor HTTP do CP2 (criar_servidor_http).
+
+Dispara requisições de várias threads, cada uma com a sua conexão
+persistente, e mede a latência de cada requisição. A mistura é de 80%
+GET /rota (modo 'menor'), 10% GET /arvore e 10% POST /lote com 20 consultas,
+sobre estações e horários sorteados. Ao final mostra, por endpoint e no
+total, p50 e p99 da latência e requisições por segundo.
+
+Sem url_base, sobe o servidor no próprio processo, em uma porta livre; o
+cliente e o servidor então disputam o mesmo GIL. Para números do servidor
+sozinho, suba-o à parte (python CP2.py servidor 8000) e passe a URL.
+
+Uso: python benchmarks/carga_http.py [requisicoes] [concorrencia] [url_base]
+"""
+
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import CP2  # noqa: E402
+
+ESTACOES = list(CP2.stations_coordinates_data)
+
+
+def sortear_requisicao(sorteio):
+    """(nome do endpoint, método, caminho, corpo) de uma requisição aleatória."""
+    hora = f"{sorteio.randrange(24):02d}:{sorteio.randrange(60):02d}"
+    tipo = sorteio.random()
+    if tipo < 0.8:
+        parametros = {
+            "origem": sorteio.choice(ESTACOES),
+            "destino": sorteio.choice(ESTACOES),
+            "hora": hora,
+        }
+        return "/rota", "GET", "/rota?" + urlencode(parametros), None
+    if tipo < 0.9:
+        parametros = {"origem": sorteio.choice(ESTACOES), "hora": hora}
+        return "/arvore", "GET", "/arvore?" + urlencode(parametros), None
+    consultas = [
+        [sorteio.choice(ESTACOES), sorteio.choice(ESTACOES), hora, "menor"] for _ in range(20)
+    ]
+    return "/lote", "POST", "/lote", json.dumps({"consultas": consultas})
+
+
+def cliente(host, porta, quantidade, semente, latencias, erros):
+    """Uma thread de carga: envia as requisições em sequência na mesma conexão."""
+    sorteio = random.Random(semente)
+    conexao = http.client.HTTPConnection(host, porta)
+    for _ in range(quantidade):
+        nome, metodo, caminho, corpo = sortear_requisicao(sorteio)
+        cabecalhos = {"Content-Type": "application/json"} if corpo else {}
+        inicio = time.perf_counter()
+        conexao.request(metodo, caminho, body=corpo, headers=cabecalhos)
+        resposta = conexao.getresponse()
+        resposta.read()
+        latencias.setdefault(nome, []).append((time.perf_counter() - inicio) * 1000)
+        if resposta.status not in (200, 404):
+            erros.append((caminho, resposta.status))
+    conexao.close()
+
+
+def resumo(nome, amostras, segundos):
+    """Linha com quantidade, p50, p99 e vazão de um conjunto de latências."""
+    percentis = statistics.quantiles(amostras, n=100) if len(amostras) > 1 else amostras * 99
+    return (
+        f"{nome:8s} {len(amostras):6d} req  p50 {percentis[49]:7.2f} ms  "
+        f"p99 {percentis[98]:7.2f} ms  {len(amostras) / segundos:8.0f} req/s"
+    )
+
+
+if __name__ == "__main__":
+    requisicoes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concorrencia = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    url_base = sys.argv[3] if len(sys.argv) > 3 else None
+
+    servidor = None
+    if url_base is None:
+        roteador = CP2.RoteadorMetroLondres(CP2.stations_coordinates_data, CP2.metro_dict)
+        servidor = CP2.criar_servidor_http(roteador, porta=0)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        host, porta = servidor.server_address[:2]
+    else:
+        url = urlsplit(url_base)
+        host, porta = url.hostname, url.port or 80
+
+    por_cliente = [requisicoes // concorrencia] * concorrencia
+    for i in range(requisicoes % concorrencia):
+        por_cliente[i] += 1
+    latencias_por_cliente = [{} for _ in range(concorrencia)]
+    erros = []
+    threads = [
+        threading.Thread(
+            target=cliente,
+            args=(host, porta, quantidade, semente, latencias_por_cliente[semente], erros),
+        )
+        for semente, quantidade in enumerate(por_cliente)
+    ]
+
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    segundos = time.perf_counter() - inicio
+
+    if servidor is not None:
+        servidor.shutdown()
+        servidor.server_close()
+
+    latencias = {}
+    for parciais in latencias_por_cliente:
+        for nome, amostras in parciais.items():
+            latencias.setdefault(nome, []).extend(amostras)
+
+    print(f"{requisicoes} requisições, {concorrencia} clientes, {segundos:.2f} s em http://{host}:{porta}")
+    for nome in sorted(latencias):
+        print(resumo(nome, latencias[nome], segundos))
+    print(resumo("total", [a for amostras in latencias.values() for a in amostras], segundos))
+    if erros:
+        print(f"{len(erros)} respostas com erro, por exemplo: {erros[0]}")
@@ -0,0 +1,89 @@
+"""
+Comparação entre o roteador por grafo (esperas fixas de FAIXAS_ESPERA) e o
+roteador por quadro de horários (Connection Scan sobre partidas reais).
+
+Os dois motores recebem os mesmos stations_coordinates_data/metro_dict. Para
+cada par de estações e cada horário de partida da amostra, mede o tempo de
+consulta de cada motor e a diferença entre os tempos de viagem calculados.
+Com o quadro gerado pelas frequências padrão, a espera média nas partidas
+reais é a mesma espera fixa do grafo, então a diferença mostra o efeito de
+esperar pelo trem de verdade.
+
+Uso: python benchmarks/comparar_horarios.py [intervalo_min] [diretorio_gtfs]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import CP2  # noqa: E402
+
+
+def horarios(intervalo_min):
+    """Horários de partida 'HH:MM' ao longo do dia, a cada intervalo_min minutos."""
+    return [f"{m // 60:02d}:{m % 60:02d}" for m in range(0, 24 * 60, intervalo_min)]
+
+
+def sem_cache(roteador):
+    """calcular_rota() com o cache de rotas limpo a cada consulta, para medir a busca."""
+
+    def calcular(*consulta):
+        roteador.memo.limpar()
+        return roteador.calcular_rota(*consulta)
+
+    return calcular
+
+
+def medir(calcular, consultas):
+    """Resultados e tempo total (ms) de um motor sobre todas as consultas."""
+    inicio = time.perf_counter()
+    resultados = [calcular(*consulta) for consulta in consultas]
+    return resultados, (time.perf_counter() - inicio) * 1000
+
+
+if __name__ == "__main__":
+    intervalo = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    diretorio = sys.argv[2] if len(sys.argv) > 2 else None
+
+    grafo = CP2.RoteadorMetroLondres(CP2.stations_coordinates_data, CP2.metro_dict)
+    quadro = CP2.QuadroHorarios.carregar_csv(diretorio) if diretorio else None
+    horarios_reais = CP2.RoteadorHorarios(
+        CP2.stations_coordinates_data, CP2.metro_dict, quadro=quadro
+    )
+    print(f"Quadro de horários: {len(horarios_reais.quadro)} conexões")
+
+    estacoes = list(CP2.stations_coordinates_data)
+    consultas = [
+        (origem, destino, hora)
+        for origem in estacoes
+        for destino in estacoes
+        if origem != destino
+        for hora in horarios(intervalo)
+    ]
+
+    por_grafo, ms_grafo = medir(sem_cache(grafo), consultas)
+    por_horarios, ms_horarios = medir(horarios_reais.calcular_rota, consultas)
+    print(f"{len(consultas)} consultas")
+    print(f"Grafo (Dijkstra): {ms_grafo:.1f} ms ({ms_grafo / len(consultas) * 1000:.0f} us/consulta)")
+    print(
+        f"Horários (Connection Scan): {ms_horarios:.1f} ms "
+        f"({ms_horarios / len(consultas) * 1000:.0f} us/consulta)"
+    )
+
+    diferencas = [
+        b.tempo - a.tempo
+        for a, b in zip(por_grafo, por_horarios)
+        if a is not None and b is not None
+    ]
+    sem_viagem = sum(1 for a, b in zip(por_grafo, por_horarios) if (a is None) != (b is None))
+    if diferencas:
+        print(
+            f"Horários - grafo (min): média {statistics.mean(diferencas):+.2f}, "
+            f"mediana {statistics.median(diferencas):+.2f}, "
+            f"mín {min(diferencas):+.2f}, máx {max(diferencas):+.2f}"
+        )
+    print(f"Consultas com viagem em só um dos motores: {sem_viagem}")
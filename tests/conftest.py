@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import CP2  # noqa: E402
+from forca_bruta import SEMENTES, rede_aleatoria  # noqa: E402
+
+
+@pytest.fixture(params=SEMENTES)
+def semente(request):
+    return request.param
+
+
+@pytest.fixture
+def roteador(semente):
+    return CP2.RoteadorMetroLondres(*rede_aleatoria(semente))
@@ -0,0 +1,148 @@
+"""
+Enumeração por força bruta e redes pequenas para os testes dos motores.
+
+A força bruta só usa o grafo em dicionário (roteador.graph) e as constantes
+do modelo de custo (FAIXAS_ESPERA e PENALIDADE_TROCA_LINHA_MIN), sem passar
+por nenhum motor do roteador.
+"""
+
+import math
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import CP2
+
+SEMENTES = range(6)
+# Horários de partida com minutos logo antes das trocas de faixa (11:00,
+# 18:00 e meia-noite), onde um trajeto começa com uma espera e termina com outra
+HORARIOS = ("08:00", "10:52", "10:55", "10:58", "14:30", "17:55", "17:59", "23:54", "23:57")
+# Para os caches, que não são limpos: minutos repetidos de uma mesma faixa
+HORARIOS_COM_REPETICAO = HORARIOS + ("10:00", "10:59", "17:00", "17:58")
+TOLERANCIA = 1e-9
+
+
+def rede_aleatoria(semente, n_estacoes=10, n_linhas=4, paradas=(3, 6)):
+    """
+    Estações e linhas no formato de stations_coordinates_data/metro_dict.
+
+    As estações ficam num retângulo de pouco mais de 1 km de lado, para que
+    os trajetos durem poucos minutos e uma rota mais lenta no começo possa
+    chegar depois de uma troca de faixa e passar à frente das outras.
+    """
+    aleatorio = random.Random(semente)
+    estacoes = {
+        f"E{i}": [51.5 + aleatorio.random() * 0.012, -0.1 + aleatorio.random() * 0.02]
+        for i in range(n_estacoes)
+    }
+    nomes = list(estacoes)
+    linhas = {}
+    cobertas = set()
+    for indice in range(n_linhas):
+        sequencia = aleatorio.sample(nomes, aleatorio.randint(*paradas))
+        linhas[f"L{indice}"] = list(zip(sequencia, sequencia[1:]))
+        cobertas.update(sequencia)
+    # Estações fora de todas as linhas ganham uma ligação própria
+    avulsas = [nome for nome in nomes if nome not in cobertas]
+    if avulsas:
+        linhas["Ramal"] = [(nome, aleatorio.choice(sorted(cobertas))) for nome in avulsas]
+    return estacoes, linhas
+
+
+def ponto(x_km, y_km):
+    """Coordenadas [lat, lon] a x_km a leste e y_km ao norte de (51.5, -0.1)."""
+    km_por_grau = math.pi * 6371 / 180
+    return [51.5 + y_km / km_por_grau, -0.1 + x_km / (km_por_grau * math.cos(math.radians(51.5)))]
+
+
+def rede_com_queda():
+    """
+    Rede em que a rota mais rápida às 10:55 começa pelo trecho mais lento.
+
+    De O a X há dois caminhos. Por P se chega antes, ainda na faixa de 1,5 min
+    de espera; por Q se chega logo depois das 11:00 e a espera em X cai para
+    1,0 min, o que compensa o atraso. O-Q-X-D leva 9,5286 min e O-P-X-D leva
+    9,7285 min.
+    """
+    estacoes = {
+        "O": ponto(0, 0),
+        "P": ponto(0.45, 0.2704),
+        "Q": ponto(0.45, -0.4155),
+        "X": ponto(0.9, 0),
+        "D": ponto(2.9, 0),
+    }
+    linhas = {"L": [("O", "P"), ("P", "X"), ("O", "Q"), ("Q", "X"), ("X", "D")]}
+    return estacoes, linhas
+
+
+def espera(hora):
+    """Espera da faixa de FAIXAS_ESPERA que contém a hora."""
+    for hora_inicial, hora_final, minutos in CP2.FAIXAS_ESPERA:
+        if hora_inicial <= hora.hour < hora_final:
+            return minutos
+    raise AssertionError(hora)
+
+
+def tempos_dos_trechos(grafo, caminho, linhas, hora):
+    """Tempo de cada trecho de uma rota, pelo mesmo modelo de custo do roteador."""
+    tempos = []
+    linha_anterior = None
+    for de, para, linha in zip(caminho, caminho[1:], linhas):
+        (conexao,) = [c for c in grafo[de] if c["vizinho"] == para and c["linha"] == linha]
+        tempo = espera(hora) + conexao["tempo"]
+        if linha_anterior is not None and linha != linha_anterior:
+            tempo += CP2.PENALIDADE_TROCA_LINHA_MIN
+        tempos.append(tempo)
+        hora += timedelta(minutes=tempo)
+        linha_anterior = linha
+    return tempos
+
+
+def custo(grafo, caminho, linhas, hora):
+    """Tempo total de uma rota, somado do fim para o começo como no roteador."""
+    total = 0.0
+    for tempo in reversed(tempos_dos_trechos(grafo, caminho, linhas, hora)):
+        total = tempo + total
+    return total
+
+
+def forca_bruta(grafo, origem, destino, hora):
+    """Todos os caminhos simples (caminho, linhas, tempo), em ordem de busca."""
+    caminhos = []
+
+    def visitar(atual, caminho, linhas):
+        if atual == destino:
+            caminhos.append((caminho, linhas, custo(grafo, caminho, linhas, hora)))
+            return
+        for conexao in grafo[atual]:
+            vizinho = conexao["vizinho"]
+            if vizinho not in caminho:
+                visitar(vizinho, caminho + [vizinho], linhas + [conexao["linha"]])
+
+    visitar(origem, [origem], [])
+    return caminhos
+
+
+def menor_tempo(grafo, origem, destino, hora_str):
+    """Menor tempo da força bruta, ou None se não houver caminho."""
+    caminhos = forca_bruta(grafo, origem, destino, hora_de(hora_str))
+    return min((tempo for _, _, tempo in caminhos), default=None)
+
+
+def consultas(roteador, semente):
+    """Pares (origem, destino) distintos sorteados da rede."""
+    aleatorio = random.Random(semente)
+    nomes = sorted(roteador.stations)
+    return [tuple(aleatorio.sample(nomes, 2)) for _ in range(4)]
+
+
+def hora_de(hora_str):
+    return datetime.strptime(hora_str, "%H:%M")
+
+
+def confere_rota(grafo, resultado, tempo_esperado, hora_str):
+    """A rota existe no grafo, custa o que diz custar e tem o tempo esperado."""
+    assert resultado.tempo == pytest.approx(tempo_esperado, abs=TOLERANCIA)
+    recalculado = custo(grafo, resultado.caminho, resultado.linhas, hora_de(hora_str))
+    assert recalculado == pytest.approx(resultado.tempo, abs=TOLERANCIA)
@@ -0,0 +1,40 @@
+"""arvore_menores_tempos: os tempos de uma origem para todas as estações."""
+
+import pytest
+
+import CP2
+from forca_bruta import HORARIOS, TOLERANCIA, confere_rota, menor_tempo, rede_com_queda
+
+
+def test_arvore_igual_a_forca_bruta(roteador, semente):
+    grafo = roteador.graph
+    nomes = sorted(roteador.stations)
+    for origem in nomes[:3]:
+        for hora_str in HORARIOS:
+            arvore = roteador.arvore_menores_tempos(origem, hora_str)
+            for destino in nomes:
+                if destino == origem:
+                    continue
+                esperado = menor_tempo(grafo, origem, destino, hora_str)
+                if esperado is None:
+                    assert destino not in arvore.tempos and arvore.caminho(destino) is None
+                    continue
+                assert arvore.tempos[destino] == pytest.approx(esperado, abs=TOLERANCIA)
+                confere_rota(grafo, arvore.caminho(destino), esperado, hora_str)
+
+
+def test_arvore_atravessa_queda_de_espera():
+    roteador = CP2.RoteadorMetroLondres(*rede_com_queda())
+    arvore = roteador.arvore_menores_tempos("O", "10:55")
+    rota = arvore.caminho("D")
+    assert rota.caminho == ["O", "Q", "X", "D"]
+    confere_rota(roteador.graph, rota, menor_tempo(roteador.graph, "O", "D", "10:55"), "10:55")
+    # X continua sendo alcançado mais cedo por P
+    assert arvore.caminho("X").caminho == ["O", "P", "X"]
+    assert arvore.tempos["X"] == pytest.approx(menor_tempo(roteador.graph, "O", "X", "10:55"))
+    # Em predecessores, X fica com o caminho mais rápido até ele mesmo
+    estado, caminho = arvore.chegada["X"], []
+    while estado is not None:
+        caminho.append(estado[0])
+        estado = arvore.predecessores[estado]
+    assert caminho[::-1] == ["O", "P", "X"]
@@ -0,0 +1,47 @@
+"""RoteadorAsync: a fachada asyncio igual a calcular_rota."""
+
+import asyncio
+
+import pytest
+
+import CP2
+from forca_bruta import TOLERANCIA, consultas, rede_aleatoria, rede_com_queda
+
+
+def test_async_igual_a_calcular_rota():
+    roteador = CP2.RoteadorMetroLondres(*rede_aleatoria(2))
+    fachada = CP2.RoteadorAsync(roteador)
+    pedidos = [
+        (origem, destino, hora_str)
+        for origem, destino in consultas(roteador, 2)
+        for hora_str in ("10:52", "10:58", "17:59")
+    ]
+
+    async def calcular_todos():
+        return await asyncio.gather(*(fachada.calcular_rota(*pedido) for pedido in pedidos))
+
+    for resultado, pedido in zip(asyncio.run(calcular_todos()), pedidos):
+        roteador.memo.limpar()
+        esperado = roteador.calcular_rota(*pedido)
+        if esperado is None:
+            assert resultado is None
+        else:
+            assert resultado.hora_inicio == pedido[2]
+            assert resultado.tempo == pytest.approx(esperado.tempo, abs=TOLERANCIA)
+
+
+def test_pedidos_coalescidos_recebem_copias():
+    roteador = CP2.RoteadorMetroLondres(*rede_com_queda())
+    fachada = CP2.RoteadorAsync(roteador)
+
+    async def calcular_dois():
+        return await asyncio.gather(
+            fachada.calcular_rota("O", "D", "10:55"), fachada.calcular_rota("O", "D", "10:55")
+        )
+
+    primeiro, segundo = asyncio.run(calcular_dois())
+    assert fachada.estatisticas()["coalescidas"] == 1
+    assert primeiro is not segundo and primeiro.caminho is not segundo.caminho
+    primeiro.caminho.append("Z")
+    primeiro.linhas.append("Z")
+    assert segundo.caminho == ["O", "Q", "X", "D"] and segundo.linhas == ["L", "L", "L"]
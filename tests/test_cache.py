@@ -0,0 +1,52 @@
+"""CacheRotas: rotas reaproveitadas entre consultas da mesma faixa de espera."""
+
+import CP2
+from forca_bruta import (
+    HORARIOS_COM_REPETICAO,
+    confere_rota,
+    consultas,
+    menor_tempo,
+    rede_aleatoria,
+    rede_com_queda,
+)
+
+
+def test_menor_com_cache_igual_a_forca_bruta(semente):
+    roteador = CP2.RoteadorMetroLondres(*rede_aleatoria(semente), cache=CP2.CacheRotas())
+    grafo = roteador.graph
+    for origem, destino in consultas(roteador, semente):
+        for hora_str in HORARIOS_COM_REPETICAO:
+            esperado = menor_tempo(grafo, origem, destino, hora_str)
+            resultado = roteador.calcular_rota(origem, destino, hora_str)
+            if esperado is None:
+                assert resultado is None
+                continue
+            confere_rota(grafo, resultado, esperado, hora_str)
+    assert roteador.memo.acertos > 0
+
+
+def test_chave_separa_faixa_e_algoritmo():
+    roteador = CP2.RoteadorMetroLondres(*rede_com_queda())
+    roteador.calcular_rota("O", "D", "08:00")
+    roteador.calcular_rota("O", "D", "08:30")
+    assert roteador.memo.estatisticas()["acertos"] == 1
+    roteador.calcular_rota("O", "D", "08:30", algoritmo="astar")
+    roteador.calcular_rota("O", "D", "14:00")
+    assert roteador.memo.estatisticas()["entradas"] == 3
+
+
+def test_rota_que_atravessa_a_troca_de_faixa_nao_e_reaproveitada():
+    roteador = CP2.RoteadorMetroLondres(*rede_com_queda())
+    # Às 10:45 a rota termina antes das 11:00 e vai para o cache; às 10:55
+    # ela já não cabe na faixa e a busca encontra a rota por Q
+    assert roteador.calcular_rota("O", "D", "10:45").caminho == ["O", "P", "X", "D"]
+    resultado = roteador.calcular_rota("O", "D", "10:55")
+    assert resultado.caminho == ["O", "Q", "X", "D"]
+    confere_rota(roteador.graph, resultado, menor_tempo(roteador.graph, "O", "D", "10:55"), "10:55")
+    assert roteador.memo.acertos == 0
+
+
+def test_resultado_do_cache_pode_ser_alterado():
+    roteador = CP2.RoteadorMetroLondres(*rede_com_queda())
+    roteador.calcular_rota("O", "D", "08:00").caminho.append("Z")
+    assert roteador.calcular_rota("O", "D", "08:00").caminho == ["O", "P", "X", "D"]
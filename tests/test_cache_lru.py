@@ -0,0 +1,67 @@
+"""CacheRotasLRU: o cache de rotas com limite de entradas e de bytes."""
+
+import pytest
+
+import CP2
+from forca_bruta import (
+    HORARIOS_COM_REPETICAO,
+    confere_rota,
+    consultas,
+    menor_tempo,
+    rede_aleatoria,
+)
+
+
+def test_menor_com_cache_lru_igual_a_forca_bruta(semente):
+    cache = CP2.CacheRotasLRU(max_entradas=4)
+    roteador = CP2.RoteadorMetroLondres(*rede_aleatoria(semente), cache=cache)
+    grafo = roteador.graph
+    for origem, destino in consultas(roteador, semente):
+        for hora_str in HORARIOS_COM_REPETICAO:
+            esperado = menor_tempo(grafo, origem, destino, hora_str)
+            resultado = roteador.calcular_rota(origem, destino, hora_str)
+            if esperado is None:
+                assert resultado is None
+                continue
+            confere_rota(grafo, resultado, esperado, hora_str)
+    assert len(cache) <= 4
+
+
+def _rota(n):
+    return {"caminho": ["A"] * n, "linhas": ["L"] * (n - 1), "tempo": float(n), "trocas": 0}
+
+
+def test_descarta_a_menos_usada_ao_passar_de_max_entradas():
+    cache = CP2.CacheRotasLRU(max_entradas=2)
+    cache.guardar("a", _rota(2), 2.0)
+    cache.guardar("b", _rota(2), 2.0)
+    assert cache.obter("a", 10) is not None
+    cache.guardar("c", _rota(2), 2.0)
+    assert cache.obter("b", 10) is None
+    assert cache.obter("a", 10) is not None and cache.obter("c", 10) is not None
+    assert cache.remocoes == 1
+
+
+def test_respeita_max_bytes():
+    tamanho = CP2.CacheRotasLRU._estimar_bytes("a", (_rota(3), 3.0))
+    cache = CP2.CacheRotasLRU(max_bytes=2 * tamanho)
+    for chave in "abcd":
+        cache.guardar(chave, _rota(3), 3.0)
+        assert cache.bytes_em_uso <= cache.max_bytes
+    assert len(cache) == 2 and cache.remocoes == 2
+    # Uma entrada maior que o orçamento inteiro não desaloja as outras
+    cache.guardar("grande", _rota(1000), 1000.0)
+    assert len(cache) == 2 and cache.obter("grande", 2000) is None
+
+
+def test_limpar_zera_o_uso():
+    cache = CP2.CacheRotasLRU(max_entradas=1)
+    cache.guardar("a", _rota(2), 2.0)
+    cache.guardar("b", _rota(2), 2.0)
+    cache.limpar()
+    assert len(cache) == 0 and cache.bytes_em_uso == 0 and cache.remocoes == 0
+
+
+def test_exige_um_limite():
+    with pytest.raises(ValueError):
+        CP2.CacheRotasLRU()
@@ -0,0 +1,50 @@
+"""gerar_rotas: o gerador de rotas simples contra a enumeração por força bruta."""
+
+import statistics
+
+import pytest
+
+from forca_bruta import TOLERANCIA, consultas, forca_bruta, hora_de
+
+
+def rotas_da_forca_bruta(grafo, origem, destino, hora_str):
+    """{(caminho, linhas): (tempo, trocas)} de todos os caminhos simples."""
+    return {
+        (tuple(caminho), tuple(linhas)): (
+            tempo,
+            sum(a != b for a, b in zip(linhas, linhas[1:])),
+        )
+        for caminho, linhas, tempo in forca_bruta(grafo, origem, destino, hora_de(hora_str))
+    }
+
+
+def test_gerar_rotas_igual_a_forca_bruta(roteador, semente):
+    grafo = roteador.graph
+    for origem, destino in consultas(roteador, semente):
+        for hora_str in ("10:58", "17:59"):
+            esperado = rotas_da_forca_bruta(grafo, origem, destino, hora_str)
+            geradas = list(roteador.gerar_rotas(origem, destino, hora_str))
+            assert len(geradas) == len(esperado)
+            for rota in geradas:
+                tempo, trocas = esperado[(tuple(rota.caminho), tuple(rota.linhas))]
+                assert rota.tempo == pytest.approx(tempo, abs=TOLERANCIA)
+                assert rota.trocas == trocas
+
+
+def test_filtros_iguais_a_forca_bruta(roteador, semente):
+    grafo = roteador.graph
+    for origem, destino in consultas(roteador, semente):
+        esperado = rotas_da_forca_bruta(grafo, origem, destino, "10:58")
+        if not esperado:
+            continue
+        max_tempo = statistics.median(tempo for tempo, _ in esperado.values())
+        filtros = [
+            ({"max_tempo": max_tempo}, lambda chave, tempo, trocas: tempo <= max_tempo),
+            ({"max_trocas": 1}, lambda chave, tempo, trocas: trocas <= 1),
+            ({"max_estacoes": 4}, lambda chave, tempo, trocas: len(chave[0]) <= 4),
+        ]
+        for argumentos, aceita in filtros:
+            geradas = roteador.gerar_rotas(origem, destino, "10:58", **argumentos)
+            assert {(tuple(r.caminho), tuple(r.linhas)) for r in geradas} == {
+                chave for chave, (tempo, trocas) in esperado.items() if aceita(chave, tempo, trocas)
+            }
@@ -0,0 +1,29 @@
+"""gerar_rotas_paralelo e calcular_rota_paralela: a enumeração em processos."""
+
+import CP2
+from forca_bruta import consultas, rede_aleatoria
+
+
+def test_gerar_rotas_paralelo_igual_a_serial():
+    roteador = CP2.RoteadorMetroLondres(*rede_aleatoria(0))
+    for origem, destino in consultas(roteador, 0)[:2]:
+        serial = list(roteador.gerar_rotas(origem, destino, "17:59"))
+        for profundidade in (1, 2):
+            paralelo = roteador.gerar_rotas_paralelo(
+                origem, destino, "17:59", workers=2, profundidade=profundidade
+            )
+            assert paralelo == serial
+        filtrado = roteador.gerar_rotas_paralelo(origem, destino, "17:59", workers=2, max_trocas=1)
+        assert filtrado == list(roteador.gerar_rotas(origem, destino, "17:59", max_trocas=1))
+
+
+def test_calcular_rota_paralela_igual_a_serial():
+    roteador = CP2.RoteadorMetroLondres(*rede_aleatoria(1))
+    pares = consultas(roteador, 1)[:2]
+    # Origem igual ao destino não tem prefixos para dividir
+    pares.append((pares[0][0], pares[0][0]))
+    for origem, destino in pares:
+        for modo in ("medio", "maior"):
+            serial = roteador.calcular_rota(origem, destino, "10:58", modo, limite_nos=None)
+            paralela = roteador.calcular_rota_paralela(origem, destino, "10:58", modo, workers=2)
+            assert paralela == serial
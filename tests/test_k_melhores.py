@@ -0,0 +1,27 @@
+"""k_melhores_rotas: as k rotas mais rápidas contra a enumeração por força bruta."""
+
+import CP2
+from forca_bruta import HORARIOS, confere_rota, consultas, forca_bruta, hora_de, rede_com_queda
+
+
+def test_k_melhores_iguais_a_forca_bruta(roteador, semente):
+    grafo = roteador.graph
+    for origem, destino in consultas(roteador, semente):
+        for hora_str in HORARIOS:
+            tempos = sorted(t for _, _, t in forca_bruta(grafo, origem, destino, hora_de(hora_str)))
+            rotas = roteador.k_melhores_rotas(origem, destino, hora_str, 5)
+            assert len(rotas) == min(5, len(tempos))
+            assert [r.tempo for r in rotas] == sorted(r.tempo for r in rotas)
+            for rota, tempo in zip(rotas, tempos):
+                confere_rota(grafo, rota, tempo, hora_str)
+            assert len({tuple(zip(r.caminho, r.linhas)) for r in rotas}) == len(rotas)
+
+
+def test_k_melhores_atravessa_queda_de_espera():
+    roteador = CP2.RoteadorMetroLondres(*rede_com_queda())
+    rotas = roteador.k_melhores_rotas("O", "D", "10:55", 3)
+    assert [r.caminho for r in rotas] == [["O", "Q", "X", "D"], ["O", "P", "X", "D"]]
+    assert [r.tempo for r in rotas] == sorted(r.tempo for r in rotas)
+    tempos = sorted(t for _, _, t in forca_bruta(roteador.graph, "O", "D", hora_de("10:55")))
+    for rota, tempo in zip(rotas, tempos):
+        confere_rota(roteador.graph, rota, tempo, "10:55")
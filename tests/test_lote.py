@@ -0,0 +1,67 @@
+"""encontrar_caminhos_em_lote: consultas em massa contra a força bruta."""
+
+import pytest
+
+import CP2
+from forca_bruta import (
+    HORARIOS,
+    TOLERANCIA,
+    confere_rota,
+    consultas,
+    menor_tempo,
+    rede_com_queda,
+)
+
+
+def test_lote_igual_a_forca_bruta(roteador, semente):
+    grafo = roteador.graph
+    lote = [
+        (origem, destino, hora_str, modo)
+        for origem, destino in consultas(roteador, semente)
+        for hora_str in HORARIOS
+        for modo in ("menor", "medio")
+    ]
+    for item, (origem, destino, hora_str, modo) in zip(
+        roteador.encontrar_caminhos_em_lote(lote), lote
+    ):
+        if modo == "menor":
+            esperado = menor_tempo(grafo, origem, destino, hora_str)
+        else:
+            roteador.memo.limpar()
+            rota = roteador.calcular_rota(origem, destino, hora_str, modo)
+            esperado = rota and rota.tempo
+        if esperado is None:
+            assert item["resultado"] is None and item["erro"] is not None
+            continue
+        assert item["erro"] is None
+        assert item["resultado"].tempo == pytest.approx(esperado, abs=TOLERANCIA)
+        if modo == "menor":
+            confere_rota(grafo, item["resultado"], esperado, hora_str)
+
+
+def test_lote_nao_reaproveita_arvore_alem_da_faixa():
+    roteador = CP2.RoteadorMetroLondres(*rede_com_queda())
+    # A árvore das 10:45 chega a D antes das 11:00, mas às 10:55 não
+    itens = roteador.encontrar_caminhos_em_lote(
+        [("O", "D", "10:45", "menor"), ("O", "D", "10:55", "menor")]
+    )
+    assert [item["resultado"].caminho for item in itens] == [
+        ["O", "P", "X", "D"],
+        ["O", "Q", "X", "D"],
+    ]
+    esperado = menor_tempo(roteador.graph, "O", "D", "10:55")
+    confere_rota(roteador.graph, itens[1]["resultado"], esperado, "10:55")
+
+
+def test_erros_ficam_no_proprio_item():
+    roteador = CP2.RoteadorMetroLondres(*rede_com_queda())
+    itens = roteador.encontrar_caminhos_em_lote(
+        [
+            ("O", "D", "25:00", "menor"),
+            ("O", "Nenhuma", "08:00", "menor"),
+            ("O", "D", "08:00", "rapido"),
+            ("O", "D", "08:00", "menor"),
+        ]
+    )
+    assert all(item["erro"] for item in itens[:3])
+    assert itens[3]["erro"] is None and itens[3]["resultado"].caminho == ["O", "P", "X", "D"]
@@ -0,0 +1,25 @@
+"""encontrar_caminhos_em_lote_paralelo: o lote em processos igual ao serial."""
+
+import CP2
+from forca_bruta import HORARIOS, consultas, rede_aleatoria, rede_com_queda
+
+
+def test_lote_paralelo_igual_ao_serial():
+    roteador = CP2.RoteadorMetroLondres(*rede_aleatoria(3))
+    roteador.construir_tabela_tempos()
+    lote = [
+        (origem, destino, hora_str, modo)
+        for origem, destino in consultas(roteador, 3)
+        for hora_str in HORARIOS
+        for modo in ("menor", "medio", "maior")
+    ]
+    lote.append((lote[0][0], lote[0][1], "25:00", "menor"))
+    assert roteador.encontrar_caminhos_em_lote_paralelo(lote, workers=2) == (
+        roteador.encontrar_caminhos_em_lote(lote)
+    )
+
+
+def test_lote_paralelo_atravessa_queda_de_espera():
+    roteador = CP2.RoteadorMetroLondres(*rede_com_queda())
+    (item,) = roteador.encontrar_caminhos_em_lote_paralelo([("O", "D", "10:55", "menor")], workers=2)
+    assert item["resultado"].caminho == ["O", "Q", "X", "D"]
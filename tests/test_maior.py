@@ -0,0 +1,28 @@
+"""Modo 'maior': o branch-and-bound contra a enumeração por força bruta."""
+
+import CP2
+from forca_bruta import HORARIOS, confere_rota, consultas, forca_bruta, hora_de, rede_aleatoria
+
+
+def test_maior_sem_orcamento_igual_a_forca_bruta(roteador, semente):
+    grafo = roteador.graph
+    for origem, destino in consultas(roteador, semente):
+        for hora_str in HORARIOS:
+            tempos = [t for _, _, t in forca_bruta(grafo, origem, destino, hora_de(hora_str))]
+            maior = roteador.calcular_rota(origem, destino, hora_str, "maior", limite_nos=None)
+            if not tempos:
+                assert maior is None
+                continue
+            confere_rota(grafo, maior, max(tempos), hora_str)
+            assert maior.completo
+
+
+def test_maior_com_orcamento_devolve_rota_valida():
+    roteador = CP2.RoteadorMetroLondres(*rede_aleatoria(0, n_estacoes=16, n_linhas=6))
+    grafo = roteador.graph
+    origem, destino = consultas(roteador, 0)[0]
+    tempos = [t for _, _, t in forca_bruta(grafo, origem, destino, hora_de("14:30"))]
+    rota, completo = roteador.rota_mais_longa(origem, destino, "14:30", limite_nos=5)
+    assert not completo and rota.completo is False
+    assert rota.tempo <= max(tempos)
+    assert any(abs(rota.tempo - tempo) < 1e-9 for tempo in tempos)
@@ -0,0 +1,22 @@
+"""matriz_distancias: a matriz NumPy de distâncias entre estações."""
+
+import pytest
+
+import CP2
+from forca_bruta import rede_aleatoria
+
+np = pytest.importorskip("numpy")
+
+
+def test_matriz_igual_ao_haversine(tmp_path):
+    roteador = CP2.RoteadorMetroLondres(*rede_aleatoria(0))
+    nomes = roteador.compacto.estacoes
+    arquivo = tmp_path / "matriz.npy"
+    matriz = roteador.matriz_distancias(str(arquivo))
+    assert matriz.dtype == np.float32 and matriz.shape == (len(nomes), len(nomes))
+    for i, de in enumerate(nomes):
+        for j, para in enumerate(nomes):
+            assert matriz[i, j] == pytest.approx(roteador._haversine(de, para), rel=1e-5, abs=1e-6)
+    assert roteador.matriz_distancias() is matriz
+    carregada = CP2.RoteadorMetroLondres.carregar_matriz_distancias(str(arquivo))
+    assert np.array_equal(carregada, matriz)
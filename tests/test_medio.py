@@ -0,0 +1,65 @@
+"""Modo 'medio': a seleção do caminho mediano contra a enumeração por força bruta."""
+
+import random
+
+import pytest
+
+import CP2
+from forca_bruta import HORARIOS, confere_rota, consultas, forca_bruta, hora_de
+
+
+def mediano_da_forca_bruta(grafo, origem, destino, hora_str):
+    """(caminho, linhas, tempo) mediano de uma ordenação estável por tempo, ou None."""
+    caminhos = sorted(forca_bruta(grafo, origem, destino, hora_de(hora_str)), key=lambda c: c[2])
+    return caminhos[(len(caminhos) - 1) // 2] if caminhos else None
+
+
+def test_medio_igual_a_forca_bruta(roteador, semente):
+    grafo = roteador.graph
+    for origem, destino in consultas(roteador, semente):
+        for hora_str in HORARIOS:
+            esperado = mediano_da_forca_bruta(grafo, origem, destino, hora_str)
+            resultado = roteador.calcular_rota(origem, destino, hora_str, "medio")
+            if esperado is None:
+                assert resultado is None
+                continue
+            assert (resultado.caminho, resultado.linhas) == (esperado[0], esperado[1])
+            confere_rota(grafo, resultado, esperado[2], hora_str)
+
+
+@pytest.mark.parametrize("tamanho_amostra", [2, 8, 4096])
+def test_tempo_mediano_com_empates(monkeypatch, tamanho_amostra):
+    # Amostras pequenas obrigam a seleção a fazer várias passadas
+    monkeypatch.setattr(CP2, "TAMANHO_AMOSTRA_MEDIANA", tamanho_amostra)
+    aleatorio = random.Random(0)
+    for _ in range(50):
+        tempos = [
+            aleatorio.choice([aleatorio.random(), round(aleatorio.random(), 1), 5.0])
+            for _ in range(aleatorio.randint(1, 500))
+        ]
+
+        def contar(inferior, superior, cortes):
+            contagem = CP2._ContagemFaixas(inferior, cortes)
+            for tempo in tempos:
+                if tempo <= superior:
+                    contagem.adicionar(tempo, aleatorio)
+            return contagem
+
+        posicao = (len(tempos) - 1) // 2
+        mediano = sorted(tempos)[posicao]
+        empates_antes = posicao - sum(1 for tempo in tempos if tempo < mediano)
+        assert CP2._tempo_mediano(contar) == (mediano, empates_antes)
+
+
+def test_tempo_mediano_sem_tempos():
+    def contar(inferior, superior, cortes):
+        return CP2._ContagemFaixas(inferior, cortes)
+
+    assert CP2._tempo_mediano(contar) is None
+
+
+def test_medio_paralelo_igual_ao_serial(roteador, semente, monkeypatch):
+    monkeypatch.setattr(CP2, "TAMANHO_AMOSTRA_MEDIANA", 2)
+    origem, destino = consultas(roteador, semente)[0]
+    serial = roteador.calcular_rota(origem, destino, "10:58", "medio")
+    assert roteador.calcular_rota_paralela(origem, destino, "10:58", "medio", workers=2) == serial
@@ -0,0 +1,52 @@
+"""Modo 'menor': a busca de rótulos contra a enumeração por força bruta."""
+
+import statistics
+
+import pytest
+
+import CP2
+from forca_bruta import (
+    HORARIOS,
+    SEMENTES,
+    confere_rota,
+    consultas,
+    forca_bruta,
+    hora_de,
+    menor_tempo,
+    rede_aleatoria,
+    rede_com_queda,
+)
+
+
+@pytest.mark.parametrize("algoritmo", CP2.ALGORITMOS)
+def test_menor_igual_a_forca_bruta(roteador, semente, algoritmo):
+    grafo = roteador.graph
+    for origem, destino in consultas(roteador, semente):
+        for hora_str in HORARIOS:
+            roteador.memo.limpar()
+            esperado = menor_tempo(grafo, origem, destino, hora_str)
+            resultado = roteador.calcular_rota(origem, destino, hora_str, "menor", algoritmo)
+            if esperado is None:
+                assert resultado is None
+                continue
+            confere_rota(grafo, resultado, esperado, hora_str)
+
+
+@pytest.mark.parametrize("algoritmo", CP2.ALGORITMOS)
+def test_menor_atravessa_queda_de_espera(algoritmo):
+    roteador = CP2.RoteadorMetroLondres(*rede_com_queda())
+    esperado = menor_tempo(roteador.graph, "O", "D", "10:55")
+    resultado = roteador.calcular_rota("O", "D", "10:55", "menor", algoritmo)
+    assert resultado.caminho == ["O", "Q", "X", "D"]
+    confere_rota(roteador.graph, resultado, esperado, "10:55")
+
+
+def test_redes_tem_caminhos_alternativos():
+    # Garante que as comparações com a força bruta não são triviais
+    quantidades = []
+    for semente in SEMENTES:
+        roteador = CP2.RoteadorMetroLondres(*rede_aleatoria(semente))
+        grafo = roteador.graph
+        for origem, destino in consultas(roteador, semente):
+            quantidades.append(len(forca_bruta(grafo, origem, destino, hora_de("10:58"))))
+    assert statistics.median(quantidades) >= 2
@@ -0,0 +1,47 @@
+"""perfil_partidas: o tempo mais rápido minuto a minuto contra a força bruta."""
+
+import pytest
+
+import CP2
+from forca_bruta import TOLERANCIA, confere_rota, consultas, menor_tempo, rede_com_queda
+
+
+def hhmm(minuto):
+    return f"{minuto // 60:02d}:{minuto % 60:02d}"
+
+
+def minutos_do_perfil(perfil):
+    """(HH:MM, trecho) de cada minuto coberto pelos trechos do perfil, em ordem."""
+    for trecho in perfil.trechos:
+        hora, minuto = map(int, trecho.partida_inicio.split(":"))
+        minuto += 60 * hora
+        while hhmm(minuto) <= trecho.partida_fim:
+            yield hhmm(minuto), trecho
+            minuto += 1
+
+
+def test_perfil_partidas_igual_a_forca_bruta(roteador, semente):
+    grafo = roteador.graph
+    for origem, destino in consultas(roteador, semente)[:2]:
+        perfil = roteador.perfil_partidas(origem, destino, "10:30", "11:10")
+        if not perfil.trechos:
+            assert menor_tempo(grafo, origem, destino, "10:30") is None
+            continue
+        minutos = list(minutos_do_perfil(perfil))
+        assert [hora_str for hora_str, _ in minutos] == [
+            hhmm(minuto) for minuto in range(10 * 60 + 30, 11 * 60 + 11)
+        ]
+        for hora_str, trecho in minutos:
+            esperado = menor_tempo(grafo, origem, destino, hora_str)
+            assert trecho.tempo == pytest.approx(esperado, abs=TOLERANCIA)
+
+
+def test_perfil_atravessa_queda_de_espera():
+    roteador = CP2.RoteadorMetroLondres(*rede_com_queda())
+    perfil = roteador.perfil_partidas("O", "D", "10:45", "11:05")
+    for hora_str, trecho in minutos_do_perfil(perfil):
+        esperado = menor_tempo(roteador.graph, "O", "D", hora_str)
+        assert trecho.tempo == pytest.approx(esperado, abs=TOLERANCIA)
+    (trecho,) = [trecho for hora_str, trecho in minutos_do_perfil(perfil) if hora_str == "10:55"]
+    assert trecho.resultado.caminho == ["O", "Q", "X", "D"]
+    confere_rota(roteador.graph, trecho.resultado, trecho.tempo, trecho.partida_inicio)
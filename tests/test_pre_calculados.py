@@ -0,0 +1,34 @@
+"""Modo 'menor' respondido por estruturas pré-calculadas, contra a força bruta."""
+
+import pytest
+
+import CP2
+from forca_bruta import HORARIOS, confere_rota, consultas, menor_tempo, rede_com_queda
+
+PREPAROS = ["construir_tabela_tempos", "construir_hierarquias"]
+
+
+@pytest.mark.parametrize("preparo", PREPAROS)
+def test_menor_pre_calculado_igual_a_forca_bruta(roteador, semente, preparo):
+    getattr(roteador, preparo)()
+    grafo = roteador.graph
+    for origem, destino in consultas(roteador, semente):
+        for hora_str in HORARIOS:
+            roteador.memo.limpar()
+            esperado = menor_tempo(grafo, origem, destino, hora_str)
+            resultado = roteador.calcular_rota(origem, destino, hora_str)
+            if esperado is None:
+                assert resultado is None
+                continue
+            confere_rota(grafo, resultado, esperado, hora_str)
+
+
+@pytest.mark.parametrize("preparo", PREPAROS)
+def test_pre_calculado_atravessa_queda_de_espera(preparo):
+    roteador = CP2.RoteadorMetroLondres(*rede_com_queda())
+    getattr(roteador, preparo)()
+    for hora_str in ("10:45", "10:55"):
+        resultado = roteador.calcular_rota("O", "D", hora_str)
+        esperado = menor_tempo(roteador.graph, "O", "D", hora_str)
+        confere_rota(roteador.graph, resultado, esperado, hora_str)
+    assert resultado.caminho == ["O", "Q", "X", "D"]
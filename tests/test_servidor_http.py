@@ -0,0 +1,48 @@
+"""criar_servidor_http: respostas JSON do servidor de rotas."""
+
+import http.client
+import json
+import threading
+
+import pytest
+
+import CP2
+from forca_bruta import rede_com_queda
+
+
+@pytest.fixture
+def servidor():
+    servidor = CP2.criar_servidor_http(CP2.RoteadorMetroLondres(*rede_com_queda()), porta=0)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def requisitar(servidor, metodo, caminho, corpo=b"", cabecalhos=None):
+    conexao = http.client.HTTPConnection(*servidor.server_address[:2], timeout=5)
+    try:
+        conexao.putrequest(metodo, caminho)
+        for nome, valor in (cabecalhos or {"Content-Length": str(len(corpo))}).items():
+            conexao.putheader(nome, valor)
+        conexao.endheaders(corpo)
+        resposta = conexao.getresponse()
+        return resposta.status, json.loads(resposta.read())
+    finally:
+        conexao.close()
+
+
+def test_rota_e_lote(servidor):
+    status, dados = requisitar(servidor, "GET", "/rota?origem=O&destino=D&hora=10:55")
+    assert status == 200 and dados["caminho"] == ["O", "Q", "X", "D"]
+    corpo = json.dumps({"consultas": [["O", "D", "10:55", "menor"], ["O", "D", "99:99", "menor"]]})
+    status, dados = requisitar(servidor, "POST", "/lote", corpo.encode())
+    assert status == 200
+    assert [item["erro"] is None for item in dados["resultados"]] == [True, False]
+
+
+@pytest.mark.parametrize("valor", ["abc", "-1"])
+def test_content_length_invalido_responde_400(servidor, valor):
+    status, dados = requisitar(servidor, "POST", "/lote", b"{}", {"Content-Length": valor})
+    assert status == 400 and valor in dados["erro"]
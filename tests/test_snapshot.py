@@ -0,0 +1,27 @@
+"""salvar_snapshot e carregar_snapshot: o roteador carregado responde igual."""
+
+import CP2
+from forca_bruta import HORARIOS, consultas, rede_aleatoria, rede_com_queda
+
+
+def test_snapshot_mantem_os_resultados(tmp_path):
+    roteador = CP2.RoteadorMetroLondres(*rede_aleatoria(1))
+    roteador.construir_tabela_tempos()
+    caminho = tmp_path / "rede.snapshot"
+    roteador.salvar_snapshot(str(caminho))
+    carregado = CP2.RoteadorMetroLondres.carregar_snapshot(str(caminho))
+    for origem, destino in consultas(roteador, 1):
+        for hora_str in HORARIOS:
+            for modo in ("menor", "medio"):
+                assert carregado.calcular_rota(
+                    origem, destino, hora_str, modo
+                ) == roteador.calcular_rota(origem, destino, hora_str, modo)
+
+
+def test_snapshot_sem_tabela(tmp_path):
+    roteador = CP2.RoteadorMetroLondres(*rede_com_queda())
+    caminho = tmp_path / "rede.snapshot"
+    roteador.salvar_snapshot(str(caminho))
+    carregado = CP2.RoteadorMetroLondres.carregar_snapshot(str(caminho))
+    assert carregado.tabela_tempos is None
+    assert carregado.calcular_rota("O", "D", "10:55").caminho == ["O", "Q", "X", "D"]
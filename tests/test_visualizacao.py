@@ -0,0 +1,31 @@
+"""visualizar_caminho e encontrar_caminho: o mapa fica fora do cálculo."""
+
+import os
+
+import pytest
+
+import CP2
+from forca_bruta import rede_com_queda
+
+pytest.importorskip("folium")
+
+
+def test_visualizar_caminho_grava_sem_imprimir(tmp_path, capsys):
+    roteador = CP2.RoteadorMetroLondres(*rede_com_queda())
+    resultado = roteador.calcular_rota("O", "D", "08:00")
+    arquivo = roteador.visualizar_caminho(
+        resultado, str(tmp_path / "mapa.html"), abrir_navegador=False
+    )
+    assert arquivo == os.path.abspath(tmp_path / "mapa.html")
+    assert os.path.getsize(arquivo) > 0
+    assert capsys.readouterr().out == ""
+
+
+def test_encontrar_caminho_imprime_o_arquivo(tmp_path, capsys, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("webbrowser.open", lambda url: True)
+    roteador = CP2.RoteadorMetroLondres(*rede_com_queda())
+    resultado = roteador.encontrar_caminho("O", "D", "08:00")
+    saida = capsys.readouterr().out
+    assert resultado.caminho == ["O", "P", "X", "D"]
+    assert str(tmp_path / "trajeto_metro_londes.html") in saida